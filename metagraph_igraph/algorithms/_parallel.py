@@ -0,0 +1,60 @@
+"""
+Helpers for splitting igraph computations over chunks of vertices in a process pool
+"""
+
+import collections
+import concurrent.futures
+import numpy as np
+
+# Graph held by each worker process, set once by the pool initializer
+_worker_graph = None
+
+
+def _init_worker(graph):
+    global _worker_graph
+    _worker_graph = graph
+
+
+def _run_chunk(func, chunk, kwargs):
+    return func(_worker_graph, chunk, **kwargs)
+
+
+def imap_chunks(func, graph, chunks, num_workers: int, **kwargs):
+    """
+    Lazily yields ``func(graph, chunk, **kwargs)`` for each chunk, in chunk order.
+
+    With ``num_workers > 1``, chunks are processed in a pool of worker processes. The graph is sent to
+    each worker once when the worker starts and is treated as read-only; only the chunks and results
+    travel with each task. At most ``2 * num_workers`` chunks are in flight, so results which are not
+    consumed yet do not pile up in memory. ``func`` must be a module-level function so that it can be pickled.
+    """
+    if num_workers <= 1:
+        for chunk in chunks:
+            yield func(graph, chunk, **kwargs)
+        return
+    with concurrent.futures.ProcessPoolExecutor(
+        num_workers, initializer=_init_worker, initargs=(graph,)
+    ) as executor:
+        pending = collections.deque()
+        for chunk in chunks:
+            if len(pending) >= 2 * num_workers:
+                yield pending.popleft().result()
+            pending.append(executor.submit(_run_chunk, func, chunk, kwargs))
+        while pending:
+            yield pending.popleft().result()
+
+
+def map_vertex_chunks(func, graph, items, num_workers: int, **kwargs) -> list:
+    """
+    Calls ``func(graph, chunk, **kwargs)`` for chunks of the vertex indices in ``items`` and
+    returns the results in chunk order. See ``imap_chunks`` for how workers are used.
+    """
+    items = np.asarray(items)
+    if num_workers <= 1 or len(items) <= 1:
+        return [func(graph, items.tolist(), **kwargs)]
+    # Use several chunks per worker to balance uneven chunk costs
+    chunks = [
+        chunk.tolist()
+        for chunk in np.array_split(items, min(len(items), 4 * num_workers))
+    ]
+    return list(imap_chunks(func, graph, chunks, num_workers, **kwargs))
@@ -0,0 +1,26 @@
+"""
+Construction of NumPy-backed results keyed by the NodeIds of an IGraph
+"""
+
+from metagraph.plugins.numpy.types import NumpyNodeMap
+from ..types import IGraph
+import numpy as np
+
+
+def node_map(graph: IGraph, values, indices=None) -> NumpyNodeMap:
+    """
+    Returns a NumpyNodeMap of ``values`` for the vertices at ``indices``,
+    or for all vertices in index order if ``indices`` is None.
+
+    NodeIds come from the graph's cached NodeId array; sequential graphs need no NodeIds at all.
+    """
+    values = np.asarray(values)
+    if indices is None:
+        num_nodes = graph.value.vcount()
+        node_ids = None if graph.is_sequential() else graph.node_id_array()
+    else:
+        num_nodes = len(indices)
+        node_ids = graph.indices_to_node_ids(indices)
+    if len(values) != num_nodes:
+        raise ValueError(f"Got {len(values)} values for {num_nodes} nodes of the graph")
+    return NumpyNodeMap(values, node_ids)
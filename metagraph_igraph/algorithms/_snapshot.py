@@ -0,0 +1,94 @@
+"""
+Read-only array snapshots of an igraph.Graph for algorithms implemented with NumPy/SciPy
+"""
+
+from ..types import IGraph
+import numpy as np
+import scipy.sparse as ss
+
+
+def mirror_edges(rows, cols, *values):
+    """
+    Returns (rows, cols, *values) with every edge of an undirected graph also listed in reverse.
+
+    Self-loops are listed once. Each array in ``values`` holds one entry per edge and is extended
+    the same way.
+    """
+    offdiag = rows != cols
+    return (
+        np.concatenate([rows, cols[offdiag]]),
+        np.concatenate([cols, rows[offdiag]]),
+        *(np.concatenate([vals, vals[offdiag]]) for vals in values),
+    )
+
+
+def gather_positions(indptr, vertices):
+    """
+    Returns (positions, counts) locating the CSR entries of every vertex in ``vertices``.
+
+    ``positions`` lists the entries of ``vertices[0]``, then ``vertices[1]``, and so on, in one
+    flat array; ``counts[i]`` is the number of entries of ``vertices[i]``.
+    """
+    counts = indptr[vertices + 1] - indptr[vertices]
+    ends = np.cumsum(counts)
+    if len(ends) == 0:
+        return np.empty(0, dtype=np.int64), counts
+    positions = np.arange(ends[-1]) + np.repeat(
+        indptr[vertices] - ends + counts, counts
+    )
+    return positions, counts
+
+
+def adjacency_csr(graph: IGraph, weights=None) -> ss.csr_matrix:
+    """
+    Returns graph.value as an (n x n) CSR matrix built from the bulk edge arrays.
+
+    Entry (i, j) is the sum of the weights of the edges i -> j, or the number of such edges
+    if ``weights`` is None. Undirected edges appear in both directions; self-loops appear once.
+    Column indices within each row are sorted, matching igraph's neighbor order.
+    """
+    g = graph.value
+    nn = g.vcount()
+    rows, cols = graph.edge_arrays()
+    if weights is None:
+        vals = np.ones(len(rows))
+    else:
+        vals = np.array(g.es[weights], dtype=float)
+    if not g.is_directed():
+        rows, cols, vals = mirror_edges(rows, cols, vals)
+    # Duplicate entries (parallel edges) are summed by the conversion to CSR
+    adj = ss.coo_matrix((vals, (rows, cols)), shape=(nn, nn)).tocsr()
+    adj.sort_indices()
+    return adj
+
+
+def incidence_csr(graph: IGraph):
+    """
+    Returns (indptr, neighbors, edge_ids) listing the out-edges of every vertex, grouped by source vertex.
+
+    The out-edges of vertex v are ``edge_ids[indptr[v]:indptr[v + 1]]``, leading to ``neighbors`` at the
+    same positions. Parallel edges are kept separately. Undirected edges are listed from both endpoints;
+    self-loops are listed once.
+
+    The snapshot is built once per graph and reused by later calls until the graph's vertex or edge
+    counts or attribute names change; its arrays are read-only. After rewiring edges without changing
+    their number, call ``metagraph_igraph.cache.invalidate(graph)``.
+    """
+    return graph._cached_snapshot("incidence_csr", lambda: _build_incidence_csr(graph))
+
+
+def _build_incidence_csr(graph: IGraph):
+    g = graph.value
+    nn = g.vcount()
+    sources, targets = graph.edge_arrays()
+    edge_ids = np.arange(len(sources))
+    if not g.is_directed():
+        sources, targets, edge_ids = mirror_edges(sources, targets, edge_ids)
+    # Edges are listed in edge id order, so a stable sort keeps parallel edges in edge id order
+    order = np.argsort(sources * nn + targets, kind="stable")
+    indptr = np.zeros(nn + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=nn), out=indptr[1:])
+    snapshot = (indptr, targets[order], edge_ids[order])
+    for arr in snapshot:
+        arr.flags.writeable = False
+    return snapshot
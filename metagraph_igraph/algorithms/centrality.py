@@ -1,16 +1,170 @@
 from metagraph import concrete_algorithm
 from metagraph.plugins.numpy.types import NumpyNodeMap, NumpyNodeSet
 from metagraph.plugins.core import exceptions
+from ..cache import cached_result
 from ..types import IGraph
+from ._parallel import map_vertex_chunks
+from ._results import node_map
+from ._snapshot import adjacency_csr
+from typing import Tuple
+import math
 import numpy as np
+import scipy.sparse as ss
 import metagraph as mg
 import igraph
 
 
+def _pagerank_operator(graph: IGraph):
+    """
+    Returns (M, dangling) where M is the transposed, out-strength normalized adjacency matrix in CSR
+    form, so that one power iteration step is ``M @ x``, and ``dangling`` masks nodes without out-edges.
+    """
+    weights = "weight" if graph.value.is_weighted() else None
+    adj = adjacency_csr(graph, weights)
+    out_strength = np.asarray(adj.sum(axis=1)).ravel()
+    dangling = out_strength == 0
+    scale = np.divide(
+        1.0, out_strength, out=np.zeros(len(out_strength)), where=~dangling
+    )
+    return (ss.diags(scale) @ adj).T.tocsr(), dangling
+
+
+def _power_iteration(M, dangling, x, reset, damping, maxiter, tolerance):
+    """
+    Runs PageRank power iteration from `x` with teleport distribution `reset`.
+    The mass of dangling nodes is redistributed according to `reset`.
+    `x` and `reset` are either vectors or (n x k) arrays whose columns are iterated together.
+
+    Returns (x, iterations, residual), where residual is the largest L1 change of the last step.
+    """
+    for iteration in range(1, maxiter + 1):
+        dangling_mass = x[dangling].sum(axis=0)
+        x_new = damping * (M @ x + dangling_mass * reset) + (1 - damping) * reset
+        residual = float(np.abs(x_new - x).sum(axis=0).max())
+        x = x_new
+        if residual < tolerance:
+            return x, iteration, residual
+    raise exceptions.ConvergenceError(
+        f"failed to converge within {maxiter} iterations (residual={residual})"
+    )
+
+
+def _node_map_to_distribution(graph: IGraph, node_map: NumpyNodeMap, name: str):
+    """
+    Returns the values of `node_map` as a vector over the graph's vertices, normalized to sum to 1.
+    Nodes missing from `node_map` are 0; NodeIds not in the graph are ignored.
+    """
+    vec = np.zeros(graph.value.vcount())
+    indices = graph.node_ids_to_indices(node_map.nodes, missing=-1)
+    present = indices >= 0
+    vec[indices[present]] = node_map.value[present]
+    total = vec.sum()
+    if total <= 0:
+        raise ValueError(f"{name} must have a positive sum over the nodes of the graph")
+    return vec / total
+
+
+def igraph_pagerank_power(
+    graph: IGraph,
+    damping: float = 0.85,
+    maxiter: int = 50,
+    tolerance: float = 1e-05,
+    *,
+    initial: mg.Optional[NumpyNodeMap] = None,
+    personalization: mg.Optional[NumpyNodeMap] = None,
+) -> Tuple[NumpyNodeMap, int, float]:
+    """
+    PageRank by power iteration over a CSR snapshot of the graph.
+
+    initial: starting vector, typically a previous PageRank result; nodes it does not cover start
+             at the uniform value. Warm-starting from a nearby solution converges in few iterations.
+    personalization: teleport (reset) distribution; uniform if not given
+
+    Returns (pagerank, iterations used, residual of the last iteration).
+    Raises ConvergenceError if the L1 change does not drop below tolerance within maxiter iterations.
+    """
+    nn = graph.value.vcount()
+    M, dangling = _pagerank_operator(graph)
+    if personalization is None:
+        reset = np.full(nn, 1 / nn)
+    else:
+        reset = _node_map_to_distribution(graph, personalization, "personalization")
+    if initial is None:
+        x = reset.copy()
+    else:
+        x = np.full(nn, 1 / nn)
+        indices = graph.node_ids_to_indices(initial.nodes, missing=-1)
+        present = indices >= 0
+        x[indices[present]] = initial.value[present]
+        x /= x.sum()
+    pr, iterations, residual = _power_iteration(
+        M, dangling, x, reset, damping, maxiter, tolerance
+    )
+    return node_map(graph, pr), iterations, residual
+
+
+def igraph_pagerank_personalized_batch(
+    graph: IGraph,
+    seeds,
+    damping: float = 0.85,
+    maxiter: int = 50,
+    tolerance: float = 1e-05,
+    *,
+    block_size: int = 64,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Personalized PageRank for many teleport seeds at once.
+
+    seeds: sequence of NumpyNodeSet (uniform teleport to the set) or NumpyNodeMap (teleport weights)
+    block_size: number of seeds iterated together as the columns of a dense (n x block_size) block
+
+    All seeds share one CSR snapshot of the graph, so each iteration of a block costs a single
+    sparse-matrix times dense-matrix product.
+    Returns (node_ids, scores) where scores[i, j] is the PageRank of node_ids[i] for seeds[j].
+    Raises ConvergenceError if any block fails to converge within maxiter iterations.
+    """
+    g = graph.value
+    nn = g.vcount()
+    M, dangling = _pagerank_operator(graph)
+    scores = np.empty((nn, len(seeds)))
+    for start in range(0, len(seeds), block_size):
+        block = seeds[start : start + block_size]
+        reset = np.empty((nn, len(block)))
+        for j, seed in enumerate(block):
+            if isinstance(seed, NumpyNodeSet):
+                seed = NumpyNodeMap(np.ones(len(seed.value)), seed.value)
+            reset[:, j] = _node_map_to_distribution(graph, seed, f"seeds[{start + j}]")
+        scores[:, start : start + len(block)], _, _ = _power_iteration(
+            M, dangling, reset.copy(), reset, damping, maxiter, tolerance
+        )
+    return graph.node_id_array(), scores
+
+
 @concrete_algorithm("centrality.pagerank")
+@cached_result
 def igraph_pagerank(
-    graph: IGraph, damping: float, maxiter: int, tolerance: float
+    graph: IGraph,
+    damping: float,
+    maxiter: int,
+    tolerance: float,
+    initial: mg.Optional[NumpyNodeMap] = None,
+    personalization: mg.Optional[NumpyNodeMap] = None,
 ) -> NumpyNodeMap:
+    """
+    igraph-specific parameters:
+    initial: warm-start vector (e.g. a previous result); uses power iteration
+    personalization: teleport distribution; uses power iteration
+    """
+    if initial is not None or personalization is not None:
+        pr, _, _ = igraph_pagerank_power(
+            graph,
+            damping,
+            maxiter,
+            tolerance,
+            initial=initial,
+            personalization=personalization,
+        )
+        return pr
     weights = "weight" if graph.value.is_weighted() else None
     opts = igraph.ARPACKOptions()
     opts.maxiter = maxiter
@@ -28,43 +182,167 @@ def igraph_pagerank(
                 f"failed to converge within {maxiter} iterations"
             )
         raise
-    node_ids = None if graph.is_sequential() else graph.value.vs["NodeId"]
-    return NumpyNodeMap(np.array(pr), node_ids)
+    return node_map(graph, pr)
+
+
+# Sampled estimates are within epsilon with probability 1 - _SAMPLING_DELTA
+_SAMPLING_DELTA = 0.1
+# Upper bound on the size of each (sources x vertices) distance block
+_DISTANCE_BLOCK_SIZE = 2**22
+
+
+def _sample_sources(num_vertices, num_samples, epsilon, seed):
+    """
+    Returns a sorted uniform sample of source vertices, or None if every vertex should be a source.
+
+    If only ``epsilon`` is given, the number of samples follows from Hoeffding's inequality with a
+    union bound over all vertices, for estimates normalized to [0, 1].
+    """
+    if num_samples is None and epsilon is not None:
+        num_samples = math.ceil(
+            math.log(2 * num_vertices / _SAMPLING_DELTA) / (2 * epsilon**2)
+        )
+    if num_samples is None or num_samples >= num_vertices:
+        return None
+    if num_samples <= 0:
+        raise ValueError(f"Number of samples must be positive, found {num_samples}")
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(num_vertices, num_samples, replace=False))
+
+
+def _betweenness_from_sources(g, sources, *, vertices, weights):
+    """Sum of the dependencies of `vertices` on shortest paths starting at `sources`"""
+    return np.array(g.betweenness(vertices=vertices, sources=sources, weights=weights))
+
+
+def _closeness_of_vertices(g, vertices, *, weights):
+    return np.array(g.closeness(vertices=vertices, mode="in", weights=weights))
+
+
+def _distance_sums_from_sources(g, sources, *, vertices, weights):
+    """
+    Returns (sum of finite distances, number of finite distances) from `sources` to each of `vertices`,
+    excluding the distance of a vertex to itself. Distances are computed in blocks of sources.
+    """
+    vertices = np.arange(g.vcount()) if vertices is None else np.asarray(vertices)
+    totals = np.zeros(len(vertices))
+    counts = np.zeros(len(vertices), dtype=np.int64)
+    block = max(1, _DISTANCE_BLOCK_SIZE // max(1, len(vertices)))
+    for start in range(0, len(sources), block):
+        block_sources = np.asarray(sources[start : start + block])
+        dist = np.array(
+            g.distances(
+                source=block_sources.tolist(),
+                target=vertices.tolist(),
+                weights=weights,
+                mode="out",
+            )
+        )
+        valid = np.isfinite(dist) & (block_sources[:, None] != vertices[None, :])
+        totals += np.where(valid, dist, 0).sum(axis=0)
+        counts += valid.sum(axis=0)
+    return totals, counts
+
+
+def _is_unseeded_sample(arguments) -> bool:
+    sampled = arguments["num_samples"] is not None or arguments["epsilon"] is not None
+    return sampled and arguments["seed"] is None
 
 
 @concrete_algorithm("centrality.betweenness")
+@cached_result(uncacheable=_is_unseeded_sample)
 def igraph_betweenness_centrality(
-    graph: IGraph, nodes: mg.Optional[NumpyNodeSet], normalize: bool
+    graph: IGraph,
+    nodes: mg.Optional[NumpyNodeSet],
+    normalize: bool,
+    num_workers: int = 1,
+    num_samples: mg.Optional[int] = None,
+    epsilon: mg.Optional[float] = None,
+    seed: mg.Optional[int] = None,
 ) -> NumpyNodeMap:
+    """
+    igraph-specific parameters:
+    num_workers: source vertices are partitioned across this many worker processes
+    num_samples: estimate betweenness from this many uniformly sampled source vertices
+    epsilon: if num_samples is not given, sample enough sources so that each normalized
+             estimate is within epsilon with probability 0.9
+    seed: random seed for sampling source vertices
+    """
+    g = graph.value
     if nodes is not None:
-        nodes = nodes.value
-        node_ids = nodes
+        vertices = graph.node_ids_to_indices(nodes.value).tolist()
     else:
-        node_ids = None if graph.is_sequential() else graph.value.vs["NodeId"]
-    if graph.value.is_weighted():
-        bc = graph.value.betweenness(vertices=nodes, weights="weight")
+        vertices = None
+    weights = "weight" if g.is_weighted() else None
+    nn = g.vcount()
+    sources = _sample_sources(nn, num_samples, epsilon, seed)
+    if sources is None and num_workers <= 1:
+        bc = _betweenness_from_sources(g, None, vertices=vertices, weights=weights)
     else:
-        bc = graph.value.betweenness(vertices=nodes)
-    return NumpyNodeMap(np.array(bc), node_ids)
+        if sources is None:
+            sources = np.arange(nn)
+        partials = map_vertex_chunks(
+            _betweenness_from_sources,
+            g,
+            sources,
+            num_workers,
+            vertices=vertices,
+            weights=weights,
+        )
+        # Scale up the dependencies of the sampled sources to estimate all sources
+        bc = np.sum(partials, axis=0) * (nn / len(sources))
+    return node_map(graph, bc, vertices)
 
 
 @concrete_algorithm("centrality.closeness")
+@cached_result(uncacheable=_is_unseeded_sample)
 def closeness_centrality(
     graph: IGraph,
     nodes: mg.Optional[NumpyNodeSet],
+    num_workers: int = 1,
+    num_samples: mg.Optional[int] = None,
+    epsilon: mg.Optional[float] = None,
+    seed: mg.Optional[int] = None,
 ) -> NumpyNodeMap:
+    """
+    igraph-specific parameters:
+    num_workers: the work is partitioned across this many worker processes
+    num_samples: estimate the mean distance to each node from this many uniformly sampled source vertices
+    epsilon: if num_samples is not given, sample enough sources so that each mean distance,
+             relative to the largest distance, is within epsilon with probability 0.9
+    seed: random seed for sampling source vertices
+    """
+    g = graph.value
     if nodes is not None:
-        nodes = nodes.value
-        node_ids = nodes
+        vertices = graph.node_ids_to_indices(nodes.value)
     else:
-        node_ids = None if graph.is_sequential() else graph.value.vs["NodeId"]
-    cc = graph.value.closeness(
-        vertices=nodes, mode="in", weights=graph.edge_weight_label
-    )
-    return NumpyNodeMap(np.array(cc), node_ids)
+        vertices = np.arange(g.vcount())
+    weights = graph.edge_weight_label
+    sources = _sample_sources(g.vcount(), num_samples, epsilon, seed)
+    if sources is None:
+        parts = map_vertex_chunks(
+            _closeness_of_vertices, g, vertices, num_workers, weights=weights
+        )
+        cc = np.concatenate(parts)
+    else:
+        parts = map_vertex_chunks(
+            _distance_sums_from_sources,
+            g,
+            sources,
+            num_workers,
+            vertices=vertices,
+            weights=weights,
+        )
+        totals = np.sum([total for total, _ in parts], axis=0)
+        counts = np.sum([count for _, count in parts], axis=0)
+        # Closeness is the inverse of the mean distance from the nodes which can reach each node
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cc = np.where(counts > 0, counts / totals, np.nan)
+    return node_map(graph, cc, None if nodes is None else vertices)
 
 
 @concrete_algorithm("centrality.eigenvector")
+@cached_result
 def eigenvector_centrality(
     graph: IGraph, maxiter: int, tolerance: float
 ) -> NumpyNodeMap:
@@ -75,5 +353,4 @@ def eigenvector_centrality(
     eigv = graph.value.eigenvector_centrality(
         scale=False, weights=weights, arpack_options=opts
     )
-    node_ids = None if graph.is_sequential() else graph.value.vs["NodeId"]
-    return NumpyNodeMap(np.array(eigv), node_ids)
+    return node_map(graph, eigv)
@@ -1,44 +1,170 @@
 from metagraph import concrete_algorithm, NodeID
 from metagraph.plugins.numpy.types import NumpyNodeMap
+from ..cache import cached_result
 from ..types import IGraph
+from ._parallel import map_vertex_chunks
+from ._results import node_map
 import igraph
 import numpy as np
 from typing import Tuple
 
 
+def _local_triangle_counts(g: igraph.Graph) -> np.ndarray:
+    """
+    Number of triangles each vertex belongs to, computed without listing the triangles.
+
+    igraph counts the closed triplets of every vertex natively; the local transitivity is
+    the ratio of closed triplets to d*(d-1)/2, so multiplying back recovers the counts.
+    """
+    if not g.is_simple():
+        g = g.copy()
+        g.simplify(multiple=True, loops=True)
+    degrees = np.array(g.degree(), dtype=np.int64)
+    transitivity = np.array(g.transitivity_local_undirected(mode="zero"))
+    triplets = degrees * (degrees - 1) // 2
+    return np.rint(transitivity * triplets).astype(np.int64)
+
+
 @concrete_algorithm("clustering.triangle_count")
+@cached_result
 def igraph_triangle_count(graph: IGraph) -> int:
-    return len(graph.value.cliques(3, 3))
+    # Each triangle is counted once by each of its three vertices
+    return int(_local_triangle_counts(graph.value).sum() // 3)
+
+
+def igraph_triangle_count_by_node(graph: IGraph) -> NumpyNodeMap:
+    """
+    Returns the number of triangles each node belongs to.
+    Summing the result and dividing by 3 gives the total number of triangles.
+    """
+    counts = _local_triangle_counts(graph.value)
+    return node_map(graph, counts)
 
 
 @concrete_algorithm("clustering.connected_components")
+@cached_result
 def igraph_connected_components(graph: IGraph) -> NumpyNodeMap:
     cc = graph.value.components(igraph.WEAK).membership
-    node_ids = None if graph.is_sequential() else graph.value.vs["NodeId"]
-    return NumpyNodeMap(np.array(cc), node_ids)
+    return node_map(graph, cc)
 
 
 @concrete_algorithm("clustering.strongly_connected_components")
+@cached_result
 def igraph_strongly_connected_components(graph: IGraph) -> NumpyNodeMap:
     cc = graph.value.components(igraph.STRONG).membership
-    node_ids = None if graph.is_sequential() else graph.value.vs["NodeId"]
-    return NumpyNodeMap(np.array(cc), node_ids)
+    return node_map(graph, cc)
+
+
+def igraph_max_flow_arrays(
+    graph: IGraph, source_node: NodeID, target_node: NodeID, *, sparse: bool = False
+):
+    """
+    Computes a maximum flow without building an output graph.
+
+    Returns (flow value, flows) where flows[i] is the flow along edge id i.
+    With ``sparse=True``, returns (flow value, edge ids, flows) for the edges with nonzero flow only.
+    """
+    g = graph.value
+    flow = g.maxflow(
+        graph.node_ids_to_indices(source_node),
+        graph.node_ids_to_indices(target_node),
+        graph.edge_weight_label,
+    )
+    flows = np.array(flow.flow, dtype=float)
+    if not sparse:
+        return flow.value, flows
+    edge_ids = np.flatnonzero(flows)
+    return flow.value, edge_ids, flows[edge_ids]
+
+
+def _max_flows_of_pairs(graph: IGraph, pairs, return_flows: bool):
+    results = [
+        igraph_max_flow_arrays(graph, source, target, sparse=True)
+        for source, target in pairs
+    ]
+    if return_flows:
+        return results
+    return [result[0] for result in results]
+
+
+def igraph_max_flow_batch(
+    graph: IGraph,
+    pairs,
+    *,
+    return_flows: bool = False,
+    num_workers: int = 1,
+):
+    """
+    Solves the maximum flow problem for many (source NodeId, target NodeId) pairs on the same graph.
+
+    Returns an array of flow values, one per pair. With ``return_flows=True``, returns a list of
+    (flow value, edge ids, flows) per pair instead, listing the edges with nonzero flow only.
+    With ``num_workers > 1``, the pairs are split over a pool of worker processes.
+    """
+    pairs = np.asarray(pairs).reshape(-1, 2)
+    results = []
+    for chunk in map_vertex_chunks(
+        _max_flows_of_pairs, graph, pairs, num_workers, return_flows=return_flows
+    ):
+        results.extend(chunk)
+    if return_flows:
+        return results
+    return np.array(results, dtype=float)
 
 
 @concrete_algorithm("flow.max_flow")
 def max_flow(
-    graph: IGraph, source_node: NodeID, target_node: NodeID
+    graph: IGraph,
+    source_node: NodeID,
+    target_node: NodeID,
+    include_zero_flow: bool = False,
 ) -> Tuple[float, IGraph]:
+    """
+    Returns the maximum flow and a graph whose edge weights are the flows.
+
+    The flow graph keeps every node but, by default, only the edges which carry flow, like the
+    scipy plugin. With ``include_zero_flow=True``, the whole graph is copied and every edge is kept.
+    """
     aprops = IGraph.Type.compute_abstract_properties(graph, {"edge_dtype"})
     g = graph.value
-    flow = g.maxflow(source_node, target_node, graph.edge_weight_label)
-    out = g.copy()
-    flow_vals = map(int, flow.flow) if aprops["edge_dtype"] == "int" else flow.flow
-    out.es[graph.edge_weight_label] = list(flow_vals)
-    return flow.value, IGraph(
+    if include_zero_flow:
+        value, flows = igraph_max_flow_arrays(graph, source_node, target_node)
+        out = g.copy()
+    else:
+        value, edge_ids, flows = igraph_max_flow_arrays(
+            graph, source_node, target_node, sparse=True
+        )
+        out = g.subgraph_edges(edge_ids.tolist(), delete_vertices=False)
+    if aprops["edge_dtype"] == "int":
+        flows = flows.astype(np.int64)
+    out.es[graph.edge_weight_label] = flows.tolist()
+    return value, IGraph(
         out,
         node_weight_label=graph.node_weight_label,
         edge_weight_label=graph.edge_weight_label,
+        assume_unique=True,
+    )
+
+
+def igraph_min_cut_arrays(
+    graph: IGraph, source_node: NodeID, target_node: NodeID
+) -> Tuple[float, np.ndarray, np.ndarray]:
+    """
+    Computes a minimum cut without building an output graph.
+
+    Returns (cut value, cut edge ids, partition) where partition[i] is 0 for vertices on the
+    source side of the cut and 1 for vertices on the target side.
+    """
+    g = graph.value
+    cut = g.mincut(
+        graph.node_ids_to_indices(source_node),
+        graph.node_ids_to_indices(target_node),
+        graph.edge_weight_label,
+    )
+    return (
+        cut.value,
+        np.array(cut.cut, dtype=np.int64),
+        np.array(cut.membership, dtype=np.int64),
     )
 
 
@@ -52,15 +178,12 @@ def min_cut(
     Returns the sum of the minimum cut weights and a graph containing only those edges
     which are part of the minimum cut.
     """
-    g = graph.value
-    cut = g.mincut(source_node, target_node, graph.edge_weight_label)
-    out = igraph.Graph(len(g.vs), directed=g.is_directed())
-    if graph.node_weight_label in g.vs.attributes():
-        out.vs[graph.node_weight_label] = g.vs[graph.node_weight_label]
-    for edge in g.es[cut.cut]:
-        out.add_edge(edge.source, edge.target, **edge.attributes())
-    return cut.value, IGraph(
+    value, cut_edges, _ = igraph_min_cut_arrays(graph, source_node, target_node)
+    # All vertices are kept; the cut edges and their attributes are copied in one call
+    out = graph.value.subgraph_edges(cut_edges.tolist(), delete_vertices=False)
+    return value, IGraph(
         out,
         node_weight_label=graph.node_weight_label,
         edge_weight_label=graph.edge_weight_label,
+        assume_unique=True,
     )
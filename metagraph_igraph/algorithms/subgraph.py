@@ -1,53 +1,235 @@
 from metagraph import concrete_algorithm
 from metagraph.plugins.numpy.types import NumpyNodeMap, NumpyNodeSet
+from metagraph import NodeID
+from ..cache import cached_result
 from ..types import IGraph
+from ._results import node_map
+from ._snapshot import gather_positions, incidence_csr
+from typing import Tuple
 import metagraph as mg
+import itertools
+import math
 import numpy as np
-import random
+import time
 
+# Above this fraction of selected vertices, copying the graph and deleting the rest is cheaper
+# than building the subgraph from scratch
+_COPY_AND_DELETE_FRACTION = 0.5
 
-@concrete_algorithm("subgraph.extract_subgraph")
-def extract_subgraph(graph: IGraph, nodes: NumpyNodeSet) -> IGraph:
-    node_list = nodes.value
-    if graph.is_sequential():
-        g = graph.value.copy()
-        g.vs["NodeId"] = range(g.vcount())
+
+def _induced_subgraph(graph: IGraph, node_list: np.ndarray) -> IGraph:
+    """
+    Returns the subgraph induced by the vertex indices in ``node_list``, keeping the original NodeIds
+
+    The parent graph is never copied as a whole just to label it; for sequential graphs, NodeIds are
+    attached to the subgraph only, from the selected indices.
+    """
+    g = graph.value
+    # igraph keeps the selected vertices in index order
+    node_list = np.unique(node_list)
+    if len(node_list) > _COPY_AND_DELETE_FRACTION * g.vcount():
+        implementation = "copy_and_delete"
     else:
-        g = graph.value
-        real_node_ids = np.array(g.vs["NodeId"])
-        node_list = real_node_ids[node_list]
-    subg = g.subgraph(node_list.tolist())
+        implementation = "create_from_scratch"
+    subg = g.induced_subgraph(node_list.tolist(), implementation=implementation)
+    if graph.is_sequential():
+        subg.vs["NodeId"] = node_list.tolist()
     return IGraph(
         subg,
         node_weight_label=graph.node_weight_label,
         edge_weight_label=graph.edge_weight_label,
+        assume_unique=True,
     )
 
 
+@concrete_algorithm("subgraph.extract_subgraph")
+def extract_subgraph(graph: IGraph, nodes: NumpyNodeSet) -> IGraph:
+    return _induced_subgraph(graph, graph.node_ids_to_indices(nodes.value))
+
+
 @concrete_algorithm("subgraph.k_core")
 def k_core(graph: IGraph, k: int) -> IGraph:
-    if graph.is_sequential():
-        g = graph.value.copy()
-        g.vs["NodeId"] = range(g.vcount())
+    coreness = np.array(graph.value.coreness(), dtype=np.int64)
+    return _induced_subgraph(graph, np.flatnonzero(coreness >= k))
+
+
+def igraph_coreness(graph: IGraph) -> NumpyNodeMap:
+    """
+    Returns the core number of every node, from a single k-core decomposition.
+
+    The k-core of the graph is made of the nodes with core number >= k; see ``igraph_k_core_from_coreness``.
+    """
+    coreness = np.array(graph.value.coreness(), dtype=np.int64)
+    return node_map(graph, coreness)
+
+
+def igraph_k_core_from_coreness(
+    graph: IGraph, coreness: NumpyNodeMap, k: int
+) -> IGraph:
+    """
+    Returns the k-core of ``graph`` using core numbers precomputed by ``igraph_coreness``,
+    so that sweeping over k does not repeat the decomposition.
+    """
+    chosen_nodes = coreness.nodes[coreness.value >= k]
+    return _induced_subgraph(graph, graph.node_ids_to_indices(chosen_nodes))
+
+
+def _match_candidates(graph: IGraph, pattern: IGraph, node_label) -> np.ndarray:
+    """
+    Returns a (pattern vertices x graph vertices) mask of the graph vertices which may match each pattern vertex.
+
+    A graph vertex is a candidate if its degrees are at least those of the pattern vertex
+    (in- and out-degrees separately for directed graphs) and, if ``node_label`` is given,
+    its value of that vertex attribute is the same.
+    """
+    g, p = graph.value, pattern.value
+    modes = ["in", "out"] if g.is_directed() else ["all"]
+    allowed = np.ones((p.vcount(), g.vcount()), dtype=bool)
+    for mode in modes:
+        graph_degrees = np.asarray(g.degree(mode=mode), dtype=np.int64)
+        pattern_degrees = np.asarray(p.degree(mode=mode), dtype=np.int64)
+        allowed &= graph_degrees >= pattern_degrees[:, None]
+    if node_label is not None:
+        graph_labels = np.array(graph.value.vs[node_label])
+        pattern_labels = np.array(pattern.value.vs[node_label])
+        allowed &= graph_labels == pattern_labels[:, None]
+    return allowed
+
+
+def igraph_subisomorphisms(
+    graph: IGraph,
+    pattern: IGraph,
+    max_matches: int = 1,
+    *,
+    induced: bool = False,
+    time_limit: mg.Optional[float] = None,
+    node_label: mg.Optional[str] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds up to ``max_matches`` (all if None) embeddings of ``pattern`` in ``graph``.
+
+    Returns (pattern NodeIds, matches) where matches[j, i] is the NodeId of the graph node matched
+    to the i-th pattern node in the j-th embedding. With ``induced=True``, only embeddings whose
+    nodes have no edges besides those of the pattern are returned. Candidates for each pattern node
+    are pruned up front by degree and, if given, by the ``node_label`` vertex attribute.
+
+    A single match without a time limit is searched with LAD. Otherwise the search runs with VF2,
+    stops as soon as ``max_matches`` embeddings are found, and raises TimeoutError once
+    ``time_limit`` seconds are exceeded.
+    """
+    g = graph.value
+    p = pattern.value
+    allowed = _match_candidates(graph, pattern, node_label)
+    matches = []
+    # If some pattern node has no candidate at all, there is nothing to search
+    if not allowed.any(axis=1).all():
+        pass
+    elif max_matches == 1 and time_limit is None:
+        domains = [np.flatnonzero(row).tolist() for row in allowed]
+        found, mapping = g.subisomorphic_lad(
+            p, domains=domains, induced=induced, return_mapping=True
+        )
+        if found:
+            matches.append(mapping)
     else:
-        g = graph.value
-    kcore = g.k_core(k)
-    return IGraph(
-        kcore,
-        node_weight_label=graph.node_weight_label,
-        edge_weight_label=graph.edge_weight_label,
-    )
+        deadline = math.inf if time_limit is None else time.monotonic() + time_limit
+        timed_out = False
+
+        def compatible(g1, g2, v1, v2):
+            nonlocal timed_out
+            if time.monotonic() > deadline:
+                # Rejecting every pair makes the search unwind quickly
+                timed_out = True
+                return False
+            return bool(allowed[v2, v1])
+
+        def on_match(g1, g2, map12, map21):
+            if induced and g1.induced_subgraph(map21).ecount() != g2.ecount():
+                return not timed_out
+            matches.append(map21)
+            return not timed_out and (max_matches is None or len(matches) < max_matches)
+
+        g.subisomorphic_vf2(p, callback=on_match, node_compat_fn=compatible)
+        if timed_out:
+            raise TimeoutError(
+                f"subgraph isomorphism search exceeded {time_limit} seconds"
+            )
+    matches = np.array(matches, dtype=np.int64).reshape(-1, p.vcount())
+    return pattern.node_id_array(), graph.indices_to_node_ids(matches)
 
 
 @concrete_algorithm("subgraph.subisomorphic")
-def igraph_isomorphic(graph: IGraph, subgraph: IGraph) -> bool:
-    return graph.value.subisomorphic_lad(subgraph.value)
+@cached_result
+def igraph_isomorphic(
+    graph: IGraph,
+    subgraph: IGraph,
+    induced: bool = False,
+    time_limit: mg.Optional[float] = None,
+) -> bool:
+    """
+    igraph-specific parameters:
+    induced: only match subgraphs which have no edges besides those of ``subgraph``
+    time_limit: raise TimeoutError if the search takes longer than this many seconds
+    """
+    _, matches = igraph_subisomorphisms(
+        graph, subgraph, induced=induced, time_limit=time_limit
+    )
+    return len(matches) > 0
+
+
+def _luby_independent_set(graph: IGraph, rng) -> np.ndarray:
+    """
+    Luby's randomized maximal independent set; returns a mask over vertex indices.
+
+    In each round, every remaining vertex draws a random priority and joins the set if it beats all
+    of its remaining neighbors; the new members and their neighbors are then removed. Each round is
+    a few bulk operations over the remaining edges, and O(log n) rounds are expected.
+    Edge direction and self-loops are ignored.
+    """
+    nn = graph.value.vcount()
+    sources, targets = graph.edge_arrays()
+    not_loop = sources != targets
+    sources, targets = sources[not_loop], targets[not_loop]
+    rows = np.concatenate([sources, targets])
+    cols = np.concatenate([targets, sources])
+    active = np.ones(nn, dtype=bool)
+    chosen = np.zeros(nn, dtype=bool)
+    while active.any():
+        priority = rng.permutation(nn)
+        lowest_neighbor = np.full(nn, nn, dtype=priority.dtype)
+        np.minimum.at(lowest_neighbor, rows, priority[cols])
+        joined = active & (priority < lowest_neighbor)
+        chosen |= joined
+        removed = joined.copy()
+        removed[cols[joined[rows]]] = True
+        active &= ~removed
+        # Only edges between remaining vertices matter for later rounds
+        remaining = active[rows] & active[cols]
+        rows, cols = rows[remaining], cols[remaining]
+    return chosen
+
+
+def _is_unseeded_luby(arguments) -> bool:
+    return not arguments["exact"] and arguments["seed"] is None
 
 
 @concrete_algorithm("subgraph.maximal_independent_set")
-def maximal_independent_set(graph: IGraph) -> NumpyNodeSet:
-    node_sets = graph.value.largest_independent_vertex_sets()
-    return NumpyNodeSet(node_sets[0])
+@cached_result(uncacheable=_is_unseeded_luby)
+def maximal_independent_set(
+    graph: IGraph, seed: mg.Optional[int] = None, exact: bool = False
+) -> NumpyNodeSet:
+    """
+    igraph-specific parameters:
+    seed: random seed for Luby's algorithm
+    exact: find a maximum independent set with igraph's exact solver instead;
+           its running time is exponential, so only use it for small graphs
+    """
+    if exact:
+        indices = np.array(graph.value.largest_independent_vertex_sets()[0])
+    else:
+        chosen = _luby_independent_set(graph, np.random.default_rng(seed))
+        indices = np.flatnonzero(chosen)
+    return NumpyNodeSet(graph.indices_to_node_ids(indices))
 
 
 @concrete_algorithm("traversal.minimum_spanning_tree")
@@ -57,28 +239,310 @@ def minimum_spanning_tree(graph: IGraph) -> IGraph:
         mst,
         node_weight_label=graph.node_weight_label,
         edge_weight_label=graph.edge_weight_label,
+        assume_unique=True,
     )
 
 
 @concrete_algorithm("subgraph.sample.node_sampling")
-def node_sampling(graph: IGraph, p: float) -> IGraph:
+def node_sampling(graph: IGraph, p: float, seed: mg.Optional[int] = None) -> IGraph:
     if p <= 0 or p > 1:
         raise ValueError(f"Probability `p` must be between 0 and 1, found {p}")
-    chosen_indices = np.random.random(len(graph.value.vs)) < p
-    chosen_nodes = np.array(graph.value.vs.indices)[chosen_indices]
-    nodes = NumpyNodeSet(chosen_nodes)
-    return extract_subgraph(graph, nodes)
+    rng = np.random.default_rng(seed)
+    chosen_nodes = np.flatnonzero(rng.random(graph.value.vcount()) < p)
+    return _induced_subgraph(graph, chosen_nodes)
 
 
 @concrete_algorithm("subgraph.sample.ties")
-def totally_induced_edge_sampling(graph: IGraph, p: float) -> IGraph:
+def totally_induced_edge_sampling(
+    graph: IGraph,
+    p: float,
+    seed: mg.Optional[int] = None,
+    chunk_size: mg.Optional[int] = None,
+) -> IGraph:
     """
     Totally Induced Edge Sampling method
     https://docs.lib.purdue.edu/cgi/viewcontent.cgi?article=2743&context=cstech
+
+    Edges are drawn with a NumPy Generator seeded by ``seed``. If ``chunk_size`` is given, the edge
+    mask is drawn ``chunk_size`` edges at a time and only the endpoints of chosen edges are copied
+    out of igraph, so the full edge list is never materialized. The chosen edges are read through an
+    edge subgraph which keeps every vertex and its attributes, so memory is still O(V) plus the sample.
+    The same seed chooses the same edges with or without chunking.
     """
     if p <= 0 or p > 1:
         raise ValueError(f"Probability `p` must be between 0 and 1, found {p}")
-    chosen_edges = [edge.tuple for edge in graph.value.es if random.random() < p]
-    chosen_nodes = set(np.array(chosen_edges).flatten())
-    nodes = NumpyNodeSet(chosen_nodes)
-    return extract_subgraph(graph, nodes)
+    rng = np.random.default_rng(seed)
+    g = graph.value
+    num_edges = g.ecount()
+    if chunk_size is None:
+        sources, targets = graph.edge_arrays()
+        chosen = rng.random(num_edges) < p
+        endpoints = np.concatenate([sources[chosen], targets[chosen]])
+    else:
+        chosen_edges = [
+            start + np.flatnonzero(rng.random(min(chunk_size, num_edges - start)) < p)
+            for start in range(0, num_edges, chunk_size)
+        ]
+        chosen_edges = (
+            np.concatenate(chosen_edges) if chosen_edges else np.empty(0, np.int64)
+        )
+        # Vertex indices are kept, so the endpoints can be read from the much smaller edge subgraph
+        sampled = g.subgraph_edges(chosen_edges, delete_vertices=False)
+        endpoints = np.fromiter(
+            itertools.chain.from_iterable(sampled.get_edgelist()),
+            dtype=np.int64,
+            count=2 * sampled.ecount(),
+        )
+    return _induced_subgraph(graph, np.unique(endpoints))
+
+
+def _walk_step(
+    indptr, neighbors, edge_ids, positions, restart_to, jump_probability, rng
+):
+    """
+    Moves every walker in ``positions`` along a random out-edge, or to ``restart_to`` with probability
+    ``jump_probability`` or when it has no out-edges.
+
+    Returns the new positions and the traversed edge ids (-1 for walkers which restarted).
+    """
+    degrees = indptr[positions + 1] - indptr[positions]
+    move = (degrees > 0) & (rng.random(len(positions)) >= jump_probability)
+    offsets = indptr[positions] + (rng.random(len(positions)) * degrees).astype(
+        np.int64
+    )
+    offsets = offsets[move]
+    new_positions = np.array(restart_to, dtype=np.int64)
+    new_positions[move] = neighbors[offsets]
+    edges = np.full(len(positions), -1, dtype=np.int64)
+    edges[move] = edge_ids[offsets]
+    return new_positions, edges
+
+
+def _sample_unvisited_neighbors(indptr, neighbors, frontier, limits, visited, rng):
+    """
+    Returns the unvisited out-neighbors of the vertices in ``frontier``, each vertex once.
+
+    If ``limits`` is given, at most ``limits[i]`` neighbors of ``frontier[i]`` are chosen at random.
+    """
+    positions, counts = gather_positions(indptr, frontier)
+    if len(positions) == 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = neighbors[positions]
+    owners = np.repeat(np.arange(len(frontier)), counts)
+    unvisited = ~visited[candidates]
+    candidates, owners = candidates[unvisited], owners[unvisited]
+    if limits is not None:
+        # Shuffle within each frontier vertex, then keep the first limits[owner] candidates
+        order = np.lexsort((rng.random(len(candidates)), owners))
+        candidates, owners = candidates[order], owners[order]
+        ranks = np.arange(len(owners)) - np.searchsorted(owners, owners)
+        candidates = candidates[ranks < limits[owners]]
+    _, first = np.unique(candidates, return_index=True)
+    return candidates[np.sort(first)]
+
+
+def _walked_subgraph(
+    graph: IGraph, visited: np.ndarray, traversed: np.ndarray
+) -> IGraph:
+    """
+    Returns the visited vertices with only the traversed edges, keeping the original NodeIds
+    """
+    g = graph.value
+    node_list = np.flatnonzero(visited)
+    subg = g.subgraph_edges(np.flatnonzero(traversed).tolist(), delete_vertices=False)
+    subg = subg.induced_subgraph(node_list.tolist())
+    if graph.is_sequential():
+        subg.vs["NodeId"] = node_list.tolist()
+    return IGraph(
+        subg,
+        node_weight_label=graph.node_weight_label,
+        edge_weight_label=graph.edge_weight_label,
+        assume_unique=True,
+    )
+
+
+@concrete_algorithm("subgraph.sample.random_walk")
+def random_walk_sampling(
+    graph: IGraph,
+    num_steps: mg.Optional[int],
+    num_nodes: mg.Optional[int],
+    num_edges: mg.Optional[int],
+    jump_probability: float,
+    start_node: mg.Optional[NodeID],
+    seed: mg.Optional[int] = None,
+    num_walks: int = 1,
+) -> IGraph:
+    """
+    Sample using random walks
+
+    Sampling ends when number of steps, nodes, or edges are reached (first to occur if multiple are specified).
+    For each step, there is a jump_probability to reset the walk.
+    When resetting the walk, if start_node is specified, always reset to this node. If not specified, every reset
+        picks a new node in the graph at random.
+
+    ``num_walks`` walkers take their steps together; with more than one walker, the node and edge
+    counts may overshoot their targets within the last step.
+    """
+    if jump_probability <= 0 or jump_probability > 1:
+        raise ValueError(
+            f"`jump_probability` must be between 0 and 1, found {jump_probability}"
+        )
+    if num_steps is None and num_nodes is None and num_edges is None:
+        raise ValueError(
+            "Must specify at least one of num_steps, num_nodes, or num_edges"
+        )
+    rng = np.random.default_rng(seed)
+    g = graph.value
+    indptr, neighbors, edge_ids = incidence_csr(graph)
+    if start_node is None:
+        positions = rng.integers(g.vcount(), size=num_walks)
+    else:
+        start = graph.node_ids_to_indices(start_node)
+        positions = np.full(num_walks, start)
+    visited = np.zeros(g.vcount(), dtype=bool)
+    visited[positions] = True
+    traversed = np.zeros(g.ecount(), dtype=bool)
+    if len(edge_ids) == 0 or (
+        start_node is not None and indptr[start + 1] == indptr[start]
+    ):
+        # The walk can never move, so it would never finish
+        return _walked_subgraph(graph, visited, traversed)
+
+    node_count = np.count_nonzero(visited)
+    edge_count = 0
+    step = 0
+    while True:
+        step += 1
+        if start_node is None:
+            restart_to = rng.integers(g.vcount(), size=num_walks)
+        else:
+            restart_to = np.full(num_walks, start)
+        previous = positions
+        positions, edges = _walk_step(
+            indptr, neighbors, edge_ids, positions, restart_to, jump_probability, rng
+        )
+        moved = edges >= 0
+        reached = np.concatenate([previous[moved], positions[moved]])
+        new_nodes = np.unique(reached[~visited[reached]])
+        visited[new_nodes] = True
+        node_count += len(new_nodes)
+        new_edges = np.unique(edges[moved][~traversed[edges[moved]]])
+        traversed[new_edges] = True
+        edge_count += len(new_edges)
+
+        if num_steps is not None and step >= num_steps:
+            break
+        if num_nodes is not None and node_count >= num_nodes:
+            break
+        if num_edges is not None and edge_count >= num_edges:
+            break
+    return _walked_subgraph(graph, visited, traversed)
+
+
+def igraph_random_walks(
+    graph: IGraph,
+    start_nodes,
+    walk_length: int,
+    restart_probability: float = 0.0,
+    *,
+    seed: mg.Optional[int] = None,
+) -> np.ndarray:
+    """
+    Runs one random walk with restart from each NodeId in ``start_nodes``, all walks advancing together.
+
+    Returns a (len(start_nodes) x walk_length + 1) array of the NodeIds visited by each walk,
+    starting with its start node. A walk returns to its start node with ``restart_probability``
+    at each step, or when it reaches a node without out-edges.
+    """
+    rng = np.random.default_rng(seed)
+    indptr, neighbors, edge_ids = incidence_csr(graph)
+    starts = np.atleast_1d(graph.node_ids_to_indices(start_nodes))
+    walks = np.empty((len(starts), walk_length + 1), dtype=np.int64)
+    walks[:, 0] = starts
+    for step in range(1, walk_length + 1):
+        walks[:, step], _ = _walk_step(
+            indptr,
+            neighbors,
+            edge_ids,
+            walks[:, step - 1],
+            starts,
+            restart_probability,
+            rng,
+        )
+    return graph.indices_to_node_ids(walks)
+
+
+def igraph_forest_fire_sampling(
+    graph: IGraph,
+    num_nodes: int,
+    forward_probability: float = 0.7,
+    *,
+    start_node=None,
+    seed: mg.Optional[int] = None,
+) -> IGraph:
+    """
+    Forest Fire sampling (Leskovec & Faloutsos, "Sampling from Large Graphs", KDD 2006)
+
+    Starting from ``start_node`` (or a random node), each burning node sets fire to a geometrically
+    distributed number of its unvisited out-neighbors, with mean forward_probability / (1 - forward_probability).
+    When the fire dies out, it restarts from a random unvisited node. Returns the subgraph induced
+    by the first ``num_nodes`` burned nodes. Every wave of the fire is burned in bulk.
+    """
+    if forward_probability < 0 or forward_probability >= 1:
+        raise ValueError(
+            f"`forward_probability` must be in [0, 1), found {forward_probability}"
+        )
+    rng = np.random.default_rng(seed)
+    num_nodes = min(num_nodes, graph.value.vcount())
+    indptr, neighbors, _ = incidence_csr(graph)
+    visited = np.zeros(graph.value.vcount(), dtype=bool)
+    frontier = np.empty(0, dtype=np.int64)
+    burned = 0
+    while burned < num_nodes:
+        if len(frontier) > 0:
+            limits = rng.geometric(1 - forward_probability, size=len(frontier)) - 1
+            frontier = _sample_unvisited_neighbors(
+                indptr, neighbors, frontier, limits, visited, rng
+            )
+        if len(frontier) == 0:
+            if burned == 0 and start_node is not None:
+                frontier = np.atleast_1d(graph.node_ids_to_indices(start_node))
+            else:
+                unvisited = np.flatnonzero(~visited)
+                frontier = unvisited[rng.integers(len(unvisited), size=1)]
+        frontier = frontier[: num_nodes - burned]
+        visited[frontier] = True
+        burned += len(frontier)
+    return _induced_subgraph(graph, np.flatnonzero(visited))
+
+
+def igraph_snowball_sampling(
+    graph: IGraph,
+    start_nodes,
+    num_waves: int,
+    max_neighbors: mg.Optional[int] = None,
+    *,
+    seed: mg.Optional[int] = None,
+) -> IGraph:
+    """
+    Snowball sampling: starting from the NodeIds in ``start_nodes``, each wave adds the unvisited
+    out-neighbors of the previous wave, at most ``max_neighbors`` of them per node chosen at random.
+
+    Returns the subgraph induced by the nodes of all ``num_waves`` waves.
+    """
+    rng = np.random.default_rng(seed)
+    indptr, neighbors, _ = incidence_csr(graph)
+    visited = np.zeros(graph.value.vcount(), dtype=bool)
+    frontier = np.unique(graph.node_ids_to_indices(start_nodes))
+    visited[frontier] = True
+    for _ in range(num_waves):
+        limits = None
+        if max_neighbors is not None:
+            limits = np.full(len(frontier), max_neighbors)
+        frontier = _sample_unvisited_neighbors(
+            indptr, neighbors, frontier, limits, visited, rng
+        )
+        if len(frontier) == 0:
+            break
+        visited[frontier] = True
+    return _induced_subgraph(graph, np.flatnonzero(visited))
@@ -1,44 +1,250 @@
+import itertools
 from typing import Tuple
 from metagraph import concrete_algorithm, NodeID
 from metagraph.plugins.numpy.types import NumpyNodeMap, NumpyVectorType
+from ..cache import cached_result
 from ..types import IGraph
+from .centrality import _DISTANCE_BLOCK_SIZE
+from ._parallel import imap_chunks
+from ._results import node_map
+from ._snapshot import mirror_edges
+import igraph
+import metagraph as mg
 import numpy as np
 
 
+def igraph_shortest_path_tree(
+    graph: IGraph, source_node: NodeID, weights=None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Single-source shortest paths returned as a shortest-path tree over vertex indices.
+
+    Returns (parents, distances) as arrays indexed by vertex. The source is its own parent.
+    Unreachable vertices have parent -1 and distance inf.
+
+    Rather than listing one path per destination, the parents are derived in bulk from the
+    distances: an edge u -> v is on a shortest path iff distance[u] + weight == distance[v].
+    """
+    g = graph.value
+    nn = g.vcount()
+    source = graph.node_ids_to_indices(source_node)
+    distances = np.array(g.distances(source, weights=weights)[0], dtype=float)
+    rows, cols = graph.edge_arrays()
+    if weights is None:
+        vals = np.ones(len(rows))
+    else:
+        vals = np.array(g.es[weights], dtype=float)
+    if not g.is_directed():
+        rows, cols, vals = mirror_edges(rows, cols, vals)
+    # Distances are computed by relaxing edges in floating point, so the edge to
+    # each vertex's actual predecessor satisfies the equality exactly
+    tight = np.isfinite(distances[rows]) & (distances[rows] + vals == distances[cols])
+    tight[cols == source] = False
+    rows, cols, vals = rows[tight], cols[tight], vals[tight]
+
+    parents = np.full(nn, -1, dtype=np.int64)
+    if len(vals) == 0 or vals.min() > 0:
+        # Distances strictly increase along tight edges, so any tight in-edge is a valid parent
+        parents[cols] = rows
+    else:
+        # Zero-weight tight edges may form cycles; a BFS over the tight edges yields a tree
+        tight_graph = igraph.Graph(
+            nn, edges=np.column_stack((rows, cols)), directed=True
+        )
+        vids, _, bfs_parents = tight_graph.bfs(source)
+        reached = np.array(vids[1:], dtype=np.int64)
+        parents[reached] = np.array(bfs_parents)[reached]
+    parents[source] = source
+    return parents, distances
+
+
 @concrete_algorithm("traversal.bellman_ford")
+@cached_result
 def igraph_bellman_ford(
     graph: IGraph, source_node: NodeID
 ) -> Tuple[NumpyNodeMap, NumpyNodeMap]:
-    nn = graph.value.vcount()
-    # Calculate path lengths
-    lengths = graph.value.shortest_paths(source_node, weights=graph.edge_weight_label)
-    lengths = np.array(lengths[0])
-    mask = lengths != np.inf
-    if not mask.all():
-        lengths[~mask] = -1
-        reachable = np.arange(nn)[mask]
+    aprops = IGraph.Type.compute_abstract_properties(graph, {"edge_dtype"})
+    parents, lengths = igraph_shortest_path_tree(
+        graph, source_node, weights=graph.edge_weight_label
+    )
+    # Only reachable nodes are part of the result
+    reachable = np.flatnonzero(np.isfinite(lengths))
+    parents = parents[reachable]
+    lengths = lengths[reachable]
+    if aprops["edge_dtype"] == "int":
+        lengths = lengths.astype(np.int64)
+    parents = graph.indices_to_node_ids(parents)
+    return (
+        node_map(graph, parents, reachable),
+        node_map(graph, lengths, reachable),
+    )
+
+
+def _distance_rows(g, sources, *, weights, mode):
+    return np.array(
+        g.distances(source=sources, target=None, weights=weights, mode=mode),
+        dtype=float,
+    )
+
+
+def igraph_iter_distance_blocks(
+    graph: IGraph,
+    sources=None,
+    *,
+    block_size: mg.Optional[int] = None,
+    num_workers: int = 1,
+    mode: str = "out",
+):
+    """
+    Multi-source shortest path distances, streamed in blocks of sources.
+
+    sources: NodeIds of the source nodes (all nodes if None)
+    block_size: number of sources per block; each block holds a (block_size x num_nodes) array.
+                By default, it is chosen so that each block holds about 4M (2**22) entries.
+    num_workers: blocks are computed concurrently in this many worker processes
+    mode: "out" for distances from the sources, "in" for distances to the sources
+
+    Yields (source NodeIds, distances) per block, in source order. Column j of ``distances``
+    corresponds to the j-th node of the graph (NodeId order of ``graph.value.vs``).
+    Unreachable nodes have distance inf.
+
+    igraph returns each block as a list of lists of Python floats before it is converted to an
+    array, so a block transiently takes several times the memory of its array.
+    """
+    g = graph.value
+    if block_size is None:
+        block_size = max(1, _DISTANCE_BLOCK_SIZE // max(1, g.vcount()))
+    if sources is None:
+        source_ids = graph.node_id_array()
+        indices = np.arange(g.vcount())
     else:
-        reachable = np.arange(nn)
-    lengths = lengths.astype(int)
-    # Calculate parents
-    parents = np.empty(nn, dtype=int)
-    paths = graph.value.get_shortest_paths(
-        source_node, to=list(reachable), weights=graph.edge_weight_label
+        source_ids = np.asarray(sources)
+        indices = graph.node_ids_to_indices(source_ids)
+    weights = (
+        graph.edge_weight_label
+        if graph.edge_weight_label in g.es.attributes()
+        else None
+    )
+    starts = range(0, len(indices), block_size)
+    chunks = (indices[start : start + block_size].tolist() for start in starts)
+    blocks = imap_chunks(
+        _distance_rows, g, chunks, num_workers, weights=weights, mode=mode
     )
-    for dest_node, path in zip(reachable, paths):
-        # Each path goes from source_node to dest_node
-        if dest_node == source_node:
-            parents[dest_node] = dest_node
-        else:
-            parents[dest_node] = path[-2]
+    for start, distances in zip(starts, blocks):
+        yield source_ids[start : start + block_size], distances
+
+
+def igraph_distance_matrix(
+    graph: IGraph,
+    sources=None,
+    *,
+    block_size: mg.Optional[int] = None,
+    num_workers: int = 1,
+    mode: str = "out",
+    filename=None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Multi-source (or all-pairs, if sources is None) shortest path distance matrix.
+
+    The matrix is filled block by block from ``igraph_iter_distance_blocks``. If ``filename`` is given,
+    it is written to a memory-mapped .npy file (readable with ``np.load(filename, mmap_mode="r")``)
+    so that the full matrix never needs to fit in memory.
+
+    Returns (source NodeIds, distances) where distances[i, j] is the distance from the i-th source
+    to the j-th node of the graph.
+    """
+    nn = graph.value.vcount()
+    num_sources = nn if sources is None else len(sources)
+    if filename is None:
+        matrix = np.empty((num_sources, nn))
+    else:
+        matrix = np.lib.format.open_memmap(
+            filename, mode="w+", dtype=float, shape=(num_sources, nn)
+        )
+    source_ids = []
+    offset = 0
+    for block_ids, distances in igraph_iter_distance_blocks(
+        graph, sources, block_size=block_size, num_workers=num_workers, mode=mode
+    ):
+        matrix[offset : offset + len(block_ids)] = distances
+        offset += len(block_ids)
+        source_ids.append(block_ids)
+    if filename is not None:
+        matrix.flush()
+    source_ids = np.concatenate(source_ids) if source_ids else np.empty(0, int)
+    return source_ids, matrix
 
-    node_ids = None if graph.is_sequential() else graph.value.vs["NodeId"]
-    return (NumpyNodeMap(parents, node_ids), NumpyNodeMap(lengths, node_ids))
+
+def igraph_multi_source_bfs(
+    graph: IGraph, source_nodes, depth_limit: int = -1
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Breadth-first search from one or more source NodeIds, stopping after ``depth_limit`` levels
+    (-1 for no limit). Traversal follows out-edges of directed graphs.
+
+    Returns (order, levels, parents):
+    order: vertex indices in visit order (sources first)
+    levels, parents: per-vertex arrays; -1 for vertices which were not visited.
+                     Sources are at level 0 and are their own parent.
+
+    Each level is expanded with a single igraph neighborhood query over the frontier only, so a
+    depth-limited search costs in proportion to the part of the graph it reaches. Within a level,
+    vertices are ordered by discovery, so the order matches a queue-based BFS.
+    """
+    g = graph.value
+    nn = g.vcount()
+    sources = np.atleast_1d(graph.node_ids_to_indices(source_nodes))
+    # Remove repeated sources, keeping the first occurrence
+    _, first = np.unique(sources, return_index=True)
+    frontier = sources[np.sort(first)]
+
+    levels = np.full(nn, -1, dtype=np.int64)
+    parents = np.full(nn, -1, dtype=np.int64)
+    levels[frontier] = 0
+    parents[frontier] = frontier
+    order = [frontier]
+    depth = 0
+    while len(frontier) > 0 and (depth_limit < 0 or depth < depth_limit):
+        depth += 1
+        neighborhoods = g.neighborhood(
+            frontier.tolist(), order=1, mode="out", mindist=1
+        )
+        counts = np.fromiter(
+            map(len, neighborhoods), dtype=np.int64, count=len(frontier)
+        )
+        candidates = np.fromiter(
+            itertools.chain.from_iterable(neighborhoods),
+            dtype=np.int64,
+            count=counts.sum(),
+        )
+        discovered_by = np.repeat(frontier, counts)
+        new = levels[candidates] == -1
+        candidates, discovered_by = candidates[new], discovered_by[new]
+        # The first discovery of each vertex sets its parent and its position in the order
+        _, first = np.unique(candidates, return_index=True)
+        first.sort()
+        frontier = candidates[first]
+        levels[frontier] = depth
+        parents[frontier] = discovered_by[first]
+        order.append(frontier)
+    return np.concatenate(order), levels, parents
 
 
 @concrete_algorithm("traversal.bfs_iter")
+@cached_result
 def igraph_breadth_first_search(
     graph: IGraph, source_node: NodeID, depth_limit: int
 ) -> NumpyVectorType:
-    nodes = [node.index for node in graph.value.bfsiter(source_node)]
-    return np.array(nodes)
+    order, _, _ = igraph_multi_source_bfs(graph, source_node, depth_limit)
+    return graph.indices_to_node_ids(order)
+
+
+@concrete_algorithm("traversal.bfs_tree")
+@cached_result
+def igraph_breadth_first_search_tree(
+    graph: IGraph, source_node: NodeID, depth_limit: int
+) -> Tuple[NumpyNodeMap, NumpyNodeMap]:
+    _, levels, parents = igraph_multi_source_bfs(graph, source_node, depth_limit)
+    visited = np.flatnonzero(levels >= 0)
+    parents = graph.indices_to_node_ids(parents[visited])
+    return node_map(graph, levels[visited], visited), node_map(graph, parents, visited)
@@ -1,24 +1,60 @@
 from metagraph import concrete_algorithm
+from typing import Tuple
 from metagraph.plugins.numpy.types import NumpyNodeMap, NumpyNodeSet
-from ..types import IGraph
+from ..cache import cached_result
+from ..types import IGraph, _scan_weights
+from ._results import node_map
+import functools
 import numpy as np
 import metagraph as mg
 
 
+def igraph_degree_arrays(
+    graph: IGraph, weights: str = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns (in, out, total) degrees of all vertices, in vertex index order, using igraph's native degree.
+
+    If ``weights`` names an edge attribute, returns the strengths (sums of edge weights) instead.
+    Degrees are int64, as are strengths for integer weights. For undirected graphs, in and out are
+    the same array as total. Self-loops count twice towards the total, as in igraph.
+    """
+    g = graph.value
+    if weights is None:
+        measure, dtype = g.degree, np.int64
+    else:
+        if weights == graph.edge_weight_label:
+            edge_dtype = IGraph.Type.compute_abstract_properties(graph, {"edge_dtype"})[
+                "edge_dtype"
+            ]
+        else:
+            edge_dtype, _ = _scan_weights(g.es[weights])
+        measure = functools.partial(g.strength, weights=weights)
+        dtype = np.int64 if edge_dtype in {"int", "bool"} else np.float64
+    if not g.is_directed():
+        total = np.asarray(measure(mode="all"), dtype=dtype)
+        return total, total, total
+    in_degrees = np.asarray(measure(mode="in"), dtype=dtype)
+    out_degrees = np.asarray(measure(mode="out"), dtype=dtype)
+    return in_degrees, out_degrees, in_degrees + out_degrees
+
+
 @concrete_algorithm("util.graph.degree")
+@cached_result
 def igraph_degree(graph: IGraph, in_edges: bool, out_edges: bool) -> NumpyNodeMap:
+    if not in_edges and not out_edges:
+        return node_map(graph, np.zeros(graph.value.vcount(), dtype=np.int64))
     if in_edges and out_edges:
-        degrees = graph.value.degree(mode="all")
+        mode = "all"
     elif in_edges:
-        degrees = graph.value.degree(mode="in")
-    elif out_edges:
-        degrees = graph.value.degree(mode="out")
+        mode = "in"
     else:
-        degrees = [0] * len(graph.value.vs)
-    node_ids = None if graph.is_sequential() else graph.value.vs["NodeId"]
-    return NumpyNodeMap(np.array(degrees), node_ids)
+        mode = "out"
+    degrees = np.asarray(graph.value.degree(mode=mode), dtype=np.int64)
+    return node_map(graph, degrees)
 
 
 @concrete_algorithm("util.graph.isomorphic")
+@cached_result
 def igraph_isomorphic(g1: IGraph, g2: IGraph) -> bool:
     return g1.value.isomorphic(g2.value)
@@ -0,0 +1,217 @@
+"""
+Opt-in memoization of deterministic algorithm results
+
+Once enabled with ``enable()``, repeated calls of a cached algorithm on the same, unchanged IGraph
+return the stored result instead of recomputing it. Results are keyed by (algorithm, parameters,
+graph fingerprint) and evicted least-recently-used first once their total size exceeds ``max_bytes``.
+
+The graph fingerprint identifies the IGraph object and a cheap summary of its structure (vertex and
+edge counts, directedness, attribute names and weight labels). Edge contents are not hashed, as that
+would cost as much as reading the whole edge list. Mutations which keep the summary unchanged, such
+as rewiring edges without changing their number or changing attribute values in place, are not
+detected; call ``invalidate(graph)`` after mutating a graph that way.
+
+Cached arrays are shared between callers and are made read-only.
+"""
+
+import collections
+import functools
+import inspect
+import itertools
+import sys
+import threading
+import weakref
+import numpy as np
+from metagraph.plugins.numpy.types import NumpyNodeMap, NumpyNodeSet
+from .types import IGraph
+
+
+class ResultCache:
+    """
+    Least-recently-used store of algorithm results, bounded by the total size of the results in bytes
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        # key -> (result, nbytes, graph tokens)
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns (found, result)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, result, tokens):
+        nbytes = _nbytes(result)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (result, nbytes, tokens)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_nbytes, _) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_nbytes
+
+    def discard_token(self, token):
+        """Removes every result computed from the graph identified by ``token``"""
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if token in entry[2]]:
+                self.nbytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+_cache = None
+_graph_tokens = weakref.WeakKeyDictionary()
+_token_counter = itertools.count()
+
+
+def enable(max_bytes: int = 256 * 2**20) -> ResultCache:
+    """Turns on result caching, replacing any existing cache, and returns the new cache"""
+    global _cache
+    _cache = ResultCache(max_bytes)
+    return _cache
+
+
+def disable():
+    """Turns off result caching and drops all cached results"""
+    global _cache
+    _cache = None
+
+
+def clear():
+    """Drops all cached results, keeping the cache enabled"""
+    if _cache is not None:
+        _cache.clear()
+
+
+def invalidate(graph: IGraph):
+    """
+    Drops all cached results computed from ``graph``, and the arrays cached on the graph itself;
+    use after mutating it in place
+    """
+    graph._reset_caches()
+    token = _graph_tokens.pop(graph, None)
+    if token is not None and _cache is not None:
+        _cache.discard_token(token)
+
+
+def _discard_token(token):
+    if _cache is not None:
+        _cache.discard_token(token)
+
+
+def _graph_token(graph: IGraph) -> int:
+    token = _graph_tokens.get(graph)
+    if token is None:
+        token = next(_token_counter)
+        _graph_tokens[graph] = token
+        # Results for a graph which no longer exists can never be hit again
+        weakref.finalize(graph, _discard_token, token)
+    return token
+
+
+def _param_key(value, tokens):
+    """Returns a hashable key for an algorithm argument; raises TypeError if there is none"""
+    if isinstance(value, IGraph):
+        token = _graph_token(value)
+        tokens.add(token)
+        return ("IGraph", token, value._mutation_fingerprint())
+    if isinstance(value, np.ndarray):
+        return ("ndarray", value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, NumpyNodeMap):
+        return (
+            "NumpyNodeMap",
+            _param_key(value.value, tokens),
+            _param_key(value.nodes, tokens),
+        )
+    if isinstance(value, NumpyNodeSet):
+        return ("NumpyNodeSet", _param_key(value.value, tokens))
+    if isinstance(value, (tuple, list)):
+        return tuple(_param_key(item, tokens) for item in value)
+    hash(value)
+    # Distinguish equal values of different types, such as 1 and 1.0
+    return (type(value).__name__, value)
+
+
+def _nbytes(result) -> int:
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    if isinstance(result, NumpyNodeMap):
+        return result.value.nbytes + result.nodes.nbytes
+    if isinstance(result, NumpyNodeSet):
+        return result.value.nbytes
+    if isinstance(result, tuple):
+        return sum(_nbytes(item) for item in result)
+    return sys.getsizeof(result)
+
+
+def _freeze(result):
+    """Makes the arrays of a result read-only, since the result is shared by all callers"""
+    if isinstance(result, np.ndarray):
+        result.flags.writeable = False
+    elif isinstance(result, NumpyNodeMap):
+        result.value.flags.writeable = False
+        result.nodes.flags.writeable = False
+    elif isinstance(result, NumpyNodeSet):
+        result.value.flags.writeable = False
+    elif isinstance(result, tuple):
+        for item in result:
+            _freeze(item)
+    return result
+
+
+def cached_result(func=None, *, uncacheable=None):
+    """
+    Decorator which memoizes ``func`` in the result cache while caching is enabled.
+
+    ``uncacheable(arguments)`` is called with the bound arguments and returns True for calls whose
+    result must not be cached, such as random sampling without a seed. Calls with arguments which
+    cannot be keyed are never cached. Apply it below ``@concrete_algorithm``.
+    """
+    if func is None:
+        return functools.partial(cached_result, uncacheable=uncacheable)
+
+    signature = inspect.signature(func)
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        cache = _cache
+        if cache is None:
+            return func(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        if uncacheable is not None and uncacheable(bound.arguments):
+            return func(*args, **kwargs)
+        tokens = set()
+        try:
+            key = (name, _param_key(tuple(bound.arguments.values()), tokens))
+        except TypeError:
+            return func(*args, **kwargs)
+        found, result = cache.get(key)
+        if found:
+            return result
+        result = _freeze(func(*args, **kwargs))
+        cache.put(key, result, frozenset(tokens))
+        return result
+
+    return wrapper
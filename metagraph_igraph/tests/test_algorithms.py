@@ -0,0 +1,392 @@
+import pytest
+import numpy as np
+from metagraph_igraph import cache
+from metagraph_igraph.types import IGraph
+from metagraph_igraph.algorithms import (
+    centrality,
+    clustering,
+    subgraph,
+    traversal,
+    utility,
+)
+from metagraph_igraph.algorithms._snapshot import incidence_csr
+from igraph import Graph
+from metagraph.plugins.numpy.types import NumpyNodeSet
+
+
+def test_triangle_count_by_node():
+    # 0 - 1 - 2 - 0 and 1 - 2 - 3 - 1 share the edge 1 - 2; 4 is isolated
+    g = Graph(
+        5, edges=[(0, 1), (1, 2), (2, 0), (2, 3), (3, 1), (1, 2)]  # repeated edge
+    )
+    counts = clustering.igraph_triangle_count_by_node(
+        IGraph(g, node_ids=[10, 11, 12, 13, 14])
+    )
+    assert (counts.nodes == [10, 11, 12, 13, 14]).all()
+    assert (counts.value == [1, 2, 2, 1, 0]).all()
+    assert clustering.igraph_triangle_count(IGraph(g)) == 2
+
+
+def test_betweenness_parallel_and_sampled():
+    g = Graph.Erdos_Renyi(60, m=200, directed=True)
+    g.es["weight"] = list(range(1, g.ecount() + 1))
+    x = IGraph(g, node_ids=list(range(100, 160)))
+    exact = centrality.igraph_betweenness_centrality(x, None, False)
+    parallel = centrality.igraph_betweenness_centrality(x, None, False, num_workers=2)
+    assert np.allclose(exact.value, parallel.value)
+    # Sampling every vertex is exact; sampling fewer is reproducible with a seed
+    everything = centrality.igraph_betweenness_centrality(
+        x, None, False, num_samples=60, seed=1
+    )
+    assert np.allclose(exact.value, everything.value)
+    sample1 = centrality.igraph_betweenness_centrality(
+        x, None, False, num_samples=20, seed=1
+    )
+    sample2 = centrality.igraph_betweenness_centrality(
+        x, None, False, num_samples=20, seed=1
+    )
+    assert (sample1.value == sample2.value).all()
+    assert (sample1.nodes == exact.nodes).all()
+
+
+def test_closeness_parallel_and_sampled():
+    g = Graph.Erdos_Renyi(60, m=200, directed=True)
+    g.es["weight"] = [1.5] * g.ecount()
+    x = IGraph(g)
+    exact = centrality.closeness_centrality(x, None)
+    parallel = centrality.closeness_centrality(x, None, num_workers=2)
+    assert np.allclose(exact.value, parallel.value, equal_nan=True)
+    sample1 = centrality.closeness_centrality(x, None, epsilon=2.0, seed=5)
+    sample2 = centrality.closeness_centrality(x, None, epsilon=2.0, seed=5)
+    assert np.allclose(sample1.value, sample2.value, equal_nan=True)
+
+
+def test_pagerank_power_iteration():
+    from metagraph.plugins.numpy.types import NumpyNodeMap
+
+    g = Graph.Erdos_Renyi(50, m=300, directed=True)
+    g.es["weight"] = list(np.linspace(0.5, 2.0, g.ecount()))
+    x = IGraph(g, node_ids=list(range(10, 60)))
+    pr, iterations, residual = centrality.igraph_pagerank_power(
+        x, maxiter=200, tolerance=1e-10
+    )
+    assert residual < 1e-10
+    assert np.allclose(pr.value, g.pagerank(weights="weight"))
+    # Warm-starting from the solution converges immediately
+    _, iterations, _ = centrality.igraph_pagerank_power(
+        x, maxiter=200, tolerance=1e-8, initial=pr
+    )
+    assert iterations == 1
+    # Personalization only teleports to the given nodes
+    reset = NumpyNodeMap(np.array([1.0, 3.0]), np.array([10, 12]))
+    ppr, _, _ = centrality.igraph_pagerank_power(
+        x, maxiter=200, tolerance=1e-10, personalization=reset
+    )
+    expected = g.personalized_pagerank(
+        weights="weight", reset=[1.0, 0.0, 3.0] + [0.0] * 47
+    )
+    assert np.allclose(ppr.value, expected)
+
+
+def test_pagerank_personalized_batch():
+    from metagraph.plugins.numpy.types import NumpyNodeMap, NumpyNodeSet
+
+    g = Graph.Erdos_Renyi(40, m=200, directed=False)
+    x = IGraph(g, node_ids=list(range(100, 140)))
+    seeds = [
+        NumpyNodeSet(np.array([100])),
+        NumpyNodeMap(np.array([1.0, 2.0]), np.array([105, 139])),
+        NumpyNodeSet(np.array([110, 111, 112])),
+    ]
+    node_ids, scores = centrality.igraph_pagerank_personalized_batch(
+        x, seeds, maxiter=300, tolerance=1e-12, block_size=2
+    )
+    assert (node_ids == np.arange(100, 140)).all()
+    assert scores.shape == (40, 3)
+    for j, reset in enumerate(([0], {5: 1.0, 39: 2.0}, [10, 11, 12])):
+        vec = np.zeros(40)
+        if isinstance(reset, dict):
+            for k, v in reset.items():
+                vec[k] = v
+        else:
+            vec[reset] = 1
+        expected = g.personalized_pagerank(reset=vec.tolist())
+        assert np.allclose(scores[:, j], expected)
+
+
+def test_shortest_path_tree():
+    # 1 <-> 2 is a zero-weight cycle; 4 is unreachable
+    g = Graph(
+        5,
+        directed=True,
+        edges=[(0, 1), (1, 2), (2, 1), (0, 3), (3, 2), (4, 0)],
+        edge_attrs={"weight": [0.5, 0.0, 0.0, 0.25, 1.0, 1.0]},
+    )
+    parents, distances = traversal.igraph_shortest_path_tree(IGraph(g), 0, "weight")
+    assert (parents == [0, 0, 1, 0, -1]).all()
+    assert np.allclose(distances, [0, 0.5, 0.5, 0.25, np.inf])
+    # Float distances are preserved and only reachable nodes are returned
+    parents, lengths = traversal.igraph_bellman_ford(
+        IGraph(g, node_ids=[10, 11, 12, 13, 14]), 10
+    )
+    assert (parents.nodes == [10, 11, 12, 13]).all()
+    assert (parents.value == [10, 10, 11, 10]).all()
+    assert np.allclose(lengths.value, [0, 0.5, 0.5, 0.25])
+
+
+def test_distance_matrix_blocks(tmp_path, monkeypatch):
+    g = Graph.Erdos_Renyi(50, m=150, directed=True)
+    g.es["weight"] = list(np.linspace(1.0, 3.0, g.ecount()))
+    x = IGraph(g, node_ids=list(range(200, 250)))
+    expected = np.array(g.distances(weights="weight"))
+    blocks = list(traversal.igraph_iter_distance_blocks(x, block_size=20))
+    assert [len(ids) for ids, _ in blocks] == [20, 20, 10]
+    assert (blocks[1][0] == np.arange(220, 240)).all()
+    # By default, blocks are sized by their number of entries
+    monkeypatch.setattr(traversal, "_DISTANCE_BLOCK_SIZE", 1000)
+    blocks = list(traversal.igraph_iter_distance_blocks(x))
+    assert [len(ids) for ids, _ in blocks] == [20, 20, 10]
+    source_ids, matrix = traversal.igraph_distance_matrix(
+        x, [249, 200], block_size=1, num_workers=2
+    )
+    assert (source_ids == [249, 200]).all()
+    assert np.array_equal(matrix, expected[[49, 0]])
+    filename = str(tmp_path / "distances.npy")
+    source_ids, matrix = traversal.igraph_distance_matrix(
+        x, block_size=16, filename=filename
+    )
+    assert np.array_equal(np.load(filename, mmap_mode="r"), expected)
+
+
+def test_multi_source_bfs():
+    # 0 -> 1 -> 2 -> 3 and 4 -> 2; 5 is unreachable
+    g = Graph(6, directed=True, edges=[(0, 1), (1, 2), (2, 3), (4, 2)])
+    x = IGraph(g, node_ids=[10, 11, 12, 13, 14, 15])
+    order, levels, parents = traversal.igraph_multi_source_bfs(x, [14, 10])
+    assert (order == [4, 0, 2, 1, 3]).all()
+    assert (levels == [0, 1, 1, 2, 0, -1]).all()
+    assert (parents == [0, 0, 4, 2, 4, -1]).all()
+    order, levels, _ = traversal.igraph_multi_source_bfs(x, 10, depth_limit=1)
+    assert (order == [0, 1]).all()
+    depths, parents = traversal.igraph_breadth_first_search_tree(x, 10, 2)
+    assert (depths.nodes == [10, 11, 12]).all()
+    assert (depths.value == [0, 1, 2]).all()
+    assert (parents.value == [10, 10, 11]).all()
+
+
+def test_depth_limited_bfs_is_frontier_local(monkeypatch):
+    g = Graph.Erdos_Renyi(500, m=2000, directed=True)
+    x = IGraph(g)
+    expected = g.bfs(0)[0]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("BFS read the full edge list")
+
+    monkeypatch.setattr(IGraph, "edge_arrays", fail)
+    monkeypatch.setattr(Graph, "get_edgelist", fail)
+    order, levels, _ = traversal.igraph_multi_source_bfs(x, 0, depth_limit=2)
+    assert levels.max() == 2
+    assert (order == expected[: len(order)]).all()
+
+
+def test_ties_seeded_and_chunked():
+    g = Graph.Erdos_Renyi(300, m=1200)
+    x = IGraph(g, node_ids=list(range(1000, 1300)))
+    full = subgraph.totally_induced_edge_sampling(x, 0.05, seed=7)
+    chunked = subgraph.totally_induced_edge_sampling(x, 0.05, seed=7, chunk_size=100)
+    assert 0 < full.value.vcount() < 300
+    assert sorted(full.value.vs["NodeId"]) == sorted(chunked.value.vs["NodeId"])
+    assert min(full.value.vs["NodeId"]) >= 1000
+    # The sample is induced: every edge between chosen nodes is kept
+    chosen = x.node_ids_to_indices(np.array(full.value.vs["NodeId"]))
+    assert full.value.ecount() == g.subgraph(chosen.tolist()).ecount()
+
+
+def test_seeded_samplers():
+    g = Graph.Erdos_Renyi(200, m=800)
+    x = IGraph(g, node_ids=list(range(100, 300)))
+    walks = subgraph.igraph_random_walks(x, [100, 150], 20, 0.1, seed=5)
+    assert walks.shape == (2, 21)
+    assert (walks[:, 0] == [100, 150]).all()
+    assert (walks == subgraph.igraph_random_walks(x, [100, 150], 20, 0.1, seed=5)).all()
+    # Every step moves along an edge or restarts at the start node
+    for walk, start in zip(x.node_ids_to_indices(walks), [0, 50]):
+        for u, v in zip(walk[:-1], walk[1:]):
+            assert v == start or g.are_adjacent(u, v)
+
+    sample = subgraph.random_walk_sampling(x, None, 30, None, 0.15, 100, seed=5)
+    assert sample.value.vcount() == 30
+    assert 100 in sample.value.vs["NodeId"]
+    fire = subgraph.igraph_forest_fire_sampling(x, 50, seed=5)
+    assert fire.value.vcount() == 50
+    assert fire.value.vs["NodeId"] == (
+        subgraph.igraph_forest_fire_sampling(x, 50, seed=5).value.vs["NodeId"]
+    )
+    snowball = subgraph.igraph_snowball_sampling(x, [100], 1)
+    assert snowball.value.vcount() == len(set(g.neighbors(0)) | {0})
+
+
+def test_sampler_snapshot_is_reused(monkeypatch):
+    g = Graph.Erdos_Renyi(100, m=300)
+    x = IGraph(g)
+    first = subgraph.igraph_random_walks(x, [0, 1], 5, seed=1)
+    edge_arrays = IGraph.edge_arrays
+
+    def fail(self):
+        raise AssertionError("snapshot was rebuilt")
+
+    monkeypatch.setattr(IGraph, "edge_arrays", fail)
+    assert (subgraph.igraph_random_walks(x, [0, 1], 5, seed=1) == first).all()
+    subgraph.igraph_snowball_sampling(x, [0], 2, seed=1)
+    # Mutating the graph invalidates the snapshot
+    g.add_edges([(0, 1)])
+    monkeypatch.setattr(IGraph, "edge_arrays", edge_arrays)
+    _, _, edge_ids = incidence_csr(x)
+    assert len(edge_ids) == 2 * g.ecount()
+    assert not edge_ids.flags.writeable
+    # Rewiring keeps the edge count, so the snapshot must be invalidated explicitly
+    removed = g.incident(0)
+    g.delete_edges(removed)
+    g.add_edges([(0, 99)] * len(removed))
+    cache.invalidate(x)
+    assert (subgraph.igraph_random_walks(x, [0], 1, seed=1) == [[0, 99]]).all()
+
+
+def test_extract_subgraph_sequential():
+    g = Graph.Erdos_Renyi(40, m=120)
+    x = IGraph(g)
+    for nodes in ([30, 2, 17], list(range(5, 40))):  # both extraction strategies
+        sub = subgraph.extract_subgraph(x, NumpyNodeSet(np.array(nodes)))
+        assert sub.value.vs["NodeId"] == sorted(nodes)
+        assert sub.value.ecount() == g.induced_subgraph(nodes).ecount()
+    assert "NodeId" not in g.vs.attributes()
+    core = subgraph.k_core(x, 3)
+    assert core.value.vs["NodeId"] == [v for v, c in enumerate(g.coreness()) if c >= 3]
+
+
+def test_coreness_and_k_core_sweep():
+    g = Graph.Erdos_Renyi(60, m=240)
+    x = IGraph(g, node_ids=list(range(500, 560)))
+    coreness = subgraph.igraph_coreness(x)
+    assert (coreness.nodes == np.arange(500, 560)).all()
+    assert (coreness.value == g.coreness()).all()
+    for k in range(1, coreness.value.max() + 2):
+        core = subgraph.igraph_k_core_from_coreness(x, coreness, k)
+        expected = subgraph.k_core(x, k)
+        assert core.value.vs["NodeId"] == expected.value.vs["NodeId"]
+        assert core.value.ecount() == expected.value.ecount()
+
+
+def test_min_cut_arrays():
+    # Two triangles joined by the edges 2 - 3 and 1 - 4
+    g = Graph(
+        6,
+        edges=[(0, 1), (1, 2), (2, 0), (3, 4), (4, 5), (5, 3), (2, 3), (1, 4)],
+        edge_attrs={"weight": [5, 5, 5, 5, 5, 5, 1, 2]},
+    )
+    x = IGraph(g, node_ids=[10, 11, 12, 13, 14, 15])
+    value, cut_edges, partition = clustering.igraph_min_cut_arrays(x, 10, 15)
+    assert value == 3
+    assert sorted(cut_edges) == [6, 7]
+    assert (partition == [0, 0, 0, 1, 1, 1]).all()
+    value, out = clustering.min_cut(x, 10, 15)
+    assert out.value.vs["NodeId"] == [10, 11, 12, 13, 14, 15]
+    assert sorted(out.value.get_edgelist()) == [(1, 4), (2, 3)]
+    assert sorted(out.value.es["weight"]) == [1, 2]
+
+
+def test_max_flow_sparse_and_batch():
+    # 0 -> 1 -> 3 and 0 -> 2 -> 3 with capacities; 4 -> 0 never carries flow
+    g = Graph(
+        5,
+        directed=True,
+        edges=[(0, 1), (1, 3), (0, 2), (2, 3), (4, 0)],
+        edge_attrs={"weight": [3, 2, 1, 4, 7]},
+    )
+    x = IGraph(g, node_ids=[10, 11, 12, 13, 14])
+    value, flows = clustering.igraph_max_flow_arrays(x, 10, 13)
+    assert value == 3
+    assert (flows == [2, 2, 1, 1, 0]).all()
+    value, edge_ids, flows = clustering.igraph_max_flow_arrays(x, 10, 13, sparse=True)
+    assert (edge_ids == [0, 1, 2, 3]).all()
+    value, out = clustering.max_flow(x, 10, 13)
+    assert out.value.vs["NodeId"] == [10, 11, 12, 13, 14]
+    assert out.value.ecount() == 4
+    assert out.value.es["weight"] == [2, 2, 1, 1]
+    value, out = clustering.max_flow(x, 10, 13, include_zero_flow=True)
+    assert out.value.es["weight"] == [2, 2, 1, 1, 0]
+    pairs = [(10, 13), (14, 13), (11, 13), (13, 10)]
+    expected = [3, 3, 2, 0]
+    assert (clustering.igraph_max_flow_batch(x, pairs) == expected).all()
+    batched = clustering.igraph_max_flow_batch(
+        x, pairs, return_flows=True, num_workers=2
+    )
+    assert [result[0] for result in batched] == expected
+    assert (batched[1][1] == [0, 1, 2, 3, 4]).all()
+
+
+def test_degree_arrays():
+    g = Graph(
+        4,
+        directed=True,
+        edges=[(0, 1), (0, 2), (2, 0), (3, 3)],
+        edge_attrs={"weight": [2, 3, 4, 5]},
+    )
+    in_degrees, out_degrees, total = utility.igraph_degree_arrays(IGraph(g))
+    assert in_degrees.dtype == np.int64
+    assert (in_degrees == [1, 1, 1, 1]).all()
+    assert (out_degrees == [2, 0, 1, 1]).all()
+    assert (total == g.degree()).all()
+    in_strength, out_strength, _ = utility.igraph_degree_arrays(IGraph(g), "weight")
+    assert in_strength.dtype == np.int64
+    assert (in_strength == [4, 2, 3, 5]).all()
+    assert (out_strength == [5, 0, 4, 5]).all()
+    g.es["score"] = [0.5, 1.0, 1.5, 2.0]
+    _, out_strength, _ = utility.igraph_degree_arrays(IGraph(g), "score")
+    assert out_strength.dtype == np.float64
+    assert (out_strength == [1.5, 0, 1.5, 2.0]).all()
+    g.to_undirected(mode="each")
+    in_degrees, out_degrees, total = utility.igraph_degree_arrays(IGraph(g))
+    assert (in_degrees == total).all() and (total == [3, 1, 2, 2]).all()
+
+
+def test_maximal_independent_set():
+    g = Graph.Erdos_Renyi(300, m=1500)
+    x = IGraph(g, node_ids=list(range(1000, 1300)))
+    nodes = subgraph.maximal_independent_set(x, seed=3)
+    assert (nodes.value == subgraph.maximal_independent_set(x, seed=3).value).all()
+    chosen = set(x.node_ids_to_indices(nodes.value).tolist())
+    for v in range(g.vcount()):
+        neighbors = set(g.neighbors(v))
+        if v in chosen:
+            assert not neighbors & chosen
+        else:
+            assert neighbors & chosen
+    petersen = Graph.Famous("Petersen")
+    assert len(subgraph.maximal_independent_set(IGraph(petersen), exact=True)) == 4
+
+
+def test_subisomorphisms():
+    # A triangle with a pendant node 3; the pattern is a path of length 2
+    g = Graph(4, edges=[(0, 1), (1, 2), (2, 0), (2, 3)])
+    g.vs["kind"] = ["a", "b", "c", "a"]
+    x = IGraph(g, node_ids=[10, 11, 12, 13])
+    pattern = IGraph(Graph(3, edges=[(0, 1), (1, 2)]), node_ids=[0, 1, 2])
+    pattern_ids, matches = subgraph.igraph_subisomorphisms(x, pattern, None)
+    assert (pattern_ids == [0, 1, 2]).all()
+    assert matches.shape == (10, 3)
+    _, matches = subgraph.igraph_subisomorphisms(x, pattern, None, induced=True)
+    assert sorted(map(tuple, matches)) == [
+        (10, 12, 13),
+        (11, 12, 13),
+        (13, 12, 10),
+        (13, 12, 11),
+    ]
+    _, matches = subgraph.igraph_subisomorphisms(x, pattern, 3, time_limit=10)
+    assert matches.shape == (3, 3)
+    # Only node 2 has degree 3, and only nodes labelled "a" may match the ends
+    pattern.value.vs["kind"] = ["a", "c", "a"]
+    _, matches = subgraph.igraph_subisomorphisms(x, pattern, None, node_label="kind")
+    assert sorted(map(tuple, matches)) == [(10, 12, 13), (13, 12, 10)]
+    assert subgraph.igraph_isomorphic(x, pattern)
+    assert not subgraph.igraph_isomorphic(x, IGraph(Graph.Full(4)), time_limit=10)
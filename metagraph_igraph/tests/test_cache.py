@@ -0,0 +1,75 @@
+import pytest
+import numpy as np
+from metagraph_igraph import cache
+from metagraph_igraph.types import IGraph
+from metagraph_igraph.algorithms import centrality, clustering, utility
+from metagraph.plugins.numpy.types import NumpyNodeSet
+from igraph import Graph
+
+
+@pytest.fixture
+def result_cache():
+    yield cache.enable()
+    cache.disable()
+
+
+def test_cached_results(result_cache):
+    g = Graph(4, edges=[(0, 1), (1, 2)])
+    x = IGraph(g, node_ids=[10, 11, 12, 13])
+    cc = clustering.igraph_connected_components(x)
+    assert clustering.igraph_connected_components(x) is cc
+    assert not cc.value.flags.writeable
+    # Different parameters and different graphs are cached separately
+    degrees = utility.igraph_degree(x, True, True)
+    assert utility.igraph_degree(x, True, False) is not degrees
+    y = IGraph(g)
+    assert clustering.igraph_connected_components(y) is not cc
+    assert result_cache.hits == 1
+
+    # Added vertices are detected
+    x.value.add_vertices(1, attributes={"NodeId": [14]})
+    cc = clustering.igraph_connected_components(x)
+    assert (cc.nodes == [10, 11, 12, 13, 14]).all()
+    assert (cc.value == [0, 0, 0, 1, 2]).all()
+    # Rewiring keeps the edge count, so it needs an explicit invalidation
+    x.value.delete_edges([1])
+    x.value.add_edge(3, 4)
+    cache.invalidate(x)
+    assert len(result_cache) == 1
+    cc = clustering.igraph_connected_components(x)
+    assert (cc.value == [0, 0, 1, 2, 2]).all()
+    cache.invalidate(x)
+    # Results for graphs which no longer exist are dropped
+    del y
+    assert len(result_cache) == 0
+
+
+def test_cache_eviction_and_unseeded_sampling(result_cache):
+    g = Graph.Erdos_Renyi(100, m=300)
+    x = IGraph(g)
+    # Room for two degree results: values and NodeIds of 100 nodes each
+    result_cache.max_bytes = 2 * 2 * 100 * 8
+    for in_edges, out_edges in [(True, True), (True, False), (False, True)]:
+        utility.igraph_degree(x, in_edges, out_edges)
+    assert len(result_cache) == 2
+    assert result_cache.nbytes <= result_cache.max_bytes
+
+    sampled = centrality.igraph_betweenness_centrality(x, None, False, num_samples=10)
+    again = centrality.igraph_betweenness_centrality(x, None, False, num_samples=10)
+    assert sampled is not again
+    seeded = centrality.igraph_betweenness_centrality(
+        x, None, False, num_samples=10, seed=1
+    )
+    assert (
+        centrality.igraph_betweenness_centrality(x, None, False, num_samples=10, seed=1)
+        is seeded
+    )
+    # Array-backed arguments are keyed by content
+    nodes = NumpyNodeSet(np.array([1, 2, 3]))
+    bc = centrality.igraph_betweenness_centrality(x, nodes, False)
+    assert (
+        centrality.igraph_betweenness_centrality(
+            x, NumpyNodeSet(np.array([1, 2, 3])), False
+        )
+        is bc
+    )
@@ -1,6 +1,6 @@
 import pytest
 import metagraph as mg
-from metagraph.plugins import has_grblas
+from metagraph.plugins import has_grblas, has_scipy
 from metagraph.tests.util import default_plugin_resolver
 import igraph
 from ..types import IGraph
@@ -35,3 +35,66 @@ def test_graphblas_2_igraph(default_plugin_resolver):
     # Convert graphblas <- igraph
     x2 = dpr.translate(y, GrblasGraph)
     dpr.assert_equal(x, x2)
+
+
+def test_igraph_2_graphblas_no_edges(default_plugin_resolver):
+    if not has_grblas:
+        pytest.skip("needs grblas")
+
+    from metagraph.plugins.graphblas.types import GrblasGraph
+
+    dpr = default_plugin_resolver
+    g = igraph.Graph(3, directed=False)
+    x = dpr.translate(IGraph(g, node_ids=[2, 5, 7]), GrblasGraph)
+    assert x.value.nvals == 0
+    assert x.nodes.nvals == 3
+    y = dpr.translate(x, IGraph)
+    dpr.assert_equal(y, IGraph(g, node_ids=[2, 5, 7]))
+
+
+def test_scipy_2_igraph(default_plugin_resolver):
+    if not has_scipy:
+        pytest.skip("needs scipy")
+
+    import scipy.sparse as ss
+    from metagraph.plugins.scipy.types import ScipyGraph
+
+    dpr = default_plugin_resolver
+    #    0 1 2
+    # 0 [1 2  ]
+    # 1 [  0 3]
+    # 2 [  3  ]
+    m = ss.csr_matrix(
+        ([1, 2, 0, 3, 3], ([0, 0, 1, 1, 2], [0, 1, 1, 2, 1])), shape=(3, 3)
+    )
+    x = ScipyGraph(m, node_list=[5, 8, 9])
+    g = igraph.Graph(
+        3,
+        directed=True,
+        edges=[(0, 0), (0, 1), (1, 1), (1, 2), (2, 1)],
+        edge_attrs={"weight": [1, 2, 0, 3, 3]},
+    )
+    intermediate = IGraph(g, node_ids=[5, 8, 9])
+    y = dpr.translate(x, IGraph)
+    dpr.assert_equal(y, intermediate)
+    x2 = dpr.translate(y, ScipyGraph)
+    dpr.assert_equal(x, x2)
+
+    # Undirected, with a self-loop and node weights
+    #    0 1 2
+    # 0 [7 2  ]
+    # 1 [2    ]
+    # 2 [     ]
+    m = ss.csr_matrix(([7.5, 2.0, 2.0], ([0, 0, 1], [0, 1, 0])), shape=(3, 3))
+    x = ScipyGraph(m, node_vals=[1, 2, 3])
+    g = igraph.Graph(
+        3,
+        directed=False,
+        edges=[(0, 0), (0, 1)],
+        edge_attrs={"weight": [7.5, 2.0]},
+        vertex_attrs={"weight": [1, 2, 3]},
+    )
+    y = dpr.translate(x, IGraph)
+    dpr.assert_equal(y, IGraph(g))
+    x2 = dpr.translate(y, ScipyGraph)
+    dpr.assert_equal(x, x2)
@@ -1,5 +1,6 @@
 import pytest
-from metagraph_igraph.types import IGraph
+import numpy as np
+from metagraph_igraph.types import IGraph, NodeIdIndex
 from metagraph import NodeLabels
 from igraph import Graph
 
@@ -142,3 +143,118 @@ def test_igraph():
     # node_ids wrong size
     with pytest.raises(TypeError):
         IGraph(g, node_ids=[10, 20, 30, 40, 50, 60])
+
+
+def test_node_id_index():
+    g = Graph(4, directed=True, edges=[(0, 1), (1, 2), (2, 3)])
+    # dense node ids use the offset table
+    dense = IGraph(g, node_ids=[3, 0, 2, 1])
+    assert dense.node_ids_to_indices(2) == 2
+    assert (dense.node_ids_to_indices(np.array([0, 1, 3])) == [1, 3, 0]).all()
+    # sparse node ids use the sorted array
+    sparse = IGraph(g, node_ids=[1000, -5, 70, 123456789])
+    assert sparse.node_ids_to_indices(-5) == 1
+    assert (sparse.node_ids_to_indices([123456789, 70]) == [3, 2]).all()
+    with pytest.raises(KeyError):
+        sparse.node_ids_to_indices([70, 71])
+    with pytest.raises(KeyError):
+        dense.node_ids_to_indices(4)
+    # sequential graphs are only bounds-checked
+    seq = IGraph(g)
+    assert (seq.node_ids_to_indices([3, 1]) == [3, 1]).all()
+    with pytest.raises(KeyError):
+        seq.node_ids_to_indices(4)
+    # duplicate node ids are rejected on first use of the lookup
+    dup_dense = IGraph(g, node_ids=[1, 2, 1, 3])
+    with pytest.raises(TypeError):
+        dup_dense.node_ids_to_indices(2)
+    dup_sparse = IGraph(g, node_ids=[1000, 5, 1000, 3])
+    with pytest.raises(TypeError):
+        dup_sparse.node_ids_to_indices(5)
+    # the lookup is built lazily and cached
+    lazy = IGraph(g, node_ids=[10, 20, 30, 40])
+    assert "node_id_index" not in lazy._snapshots
+    lazy.node_ids_to_indices(30)
+    index = lazy._node_id_index()
+    lazy.node_ids_to_indices(40)
+    assert lazy._node_id_index() is index
+    # Adding vertices rebuilds the NodeIds and their lookup
+    lazy.value.add_vertices(1, attributes={"NodeId": [50]})
+    assert (lazy.node_id_array() == [10, 20, 30, 40, 50]).all()
+    assert lazy.node_ids_to_indices(50) == 4
+
+
+@pytest.mark.parametrize("node_ids", [[3, 0, 2], [30, 1000, 20]])  # dense and sparse
+def test_node_id_index_query_dtypes(node_ids):
+    index = NodeIdIndex(np.array(node_ids))
+    assert (index.lookup(np.array([float(node_ids[1])])) == [1]).all()
+    with pytest.raises(KeyError):
+        index.lookup(np.array([7.0]))
+    with pytest.raises(TypeError):
+        index.lookup(np.array([2.5]))
+    assert float(node_ids[1]) in index
+    assert 7.0 not in index
+    assert 2.5 not in index
+
+
+def test_edge_arrays():
+    g = Graph(4, directed=True, edges=[(0, 1), (3, 2), (2, 2)])
+    sources, targets = IGraph(g).edge_arrays()
+    assert sources.dtype == np.int64
+    assert (sources == [0, 3, 2]).all()
+    assert (targets == [1, 2, 2]).all()
+    sources, targets = IGraph(Graph(2)).edge_arrays()
+    assert len(sources) == len(targets) == 0
+
+
+def test_abstract_properties_cache():
+    g = Graph(3, directed=True, edges=[(0, 1), (1, 2)], edge_attrs={"weight": [1, 2]})
+    x = IGraph(g)
+    props = IGraph.Type.compute_abstract_properties(
+        x, {"edge_dtype", "edge_has_negative_weights"}
+    )
+    assert props["edge_dtype"] == "int"
+    assert props["edge_has_negative_weights"] is False
+    # Mutating the graph invalidates the cached properties
+    g.add_edge(2, 0, weight=-1.5)
+    props = IGraph.Type.compute_abstract_properties(
+        x, {"edge_dtype", "edge_has_negative_weights"}
+    )
+    assert props["edge_dtype"] == "float"
+    assert props["edge_has_negative_weights"] is True
+    del g.es["weight"]
+    props = IGraph.Type.compute_abstract_properties(x, {"edge_type"})
+    assert props["edge_type"] == "set"
+
+
+def test_igraph_assert_equal_multigraph_undirected():
+    aprops = {
+        "is_directed": False,
+        "node_type": "set",
+        "edge_type": "map",
+        "edge_dtype": "int",
+    }
+    g1 = Graph(3, edges=[(0, 1), (1, 0), (2, 1)], edge_attrs={"weight": [5, 7, 1]})
+    # Same multigraph with edges in a different order and orientation
+    g2 = Graph(3, edges=[(1, 2), (0, 1), (0, 1)], edge_attrs={"weight": [1, 7, 5]})
+    IGraph.Type.assert_equal(IGraph(g1), IGraph(g2), aprops, aprops, {}, {})
+    # Parallel edge weights differ
+    g3 = Graph(3, edges=[(1, 2), (0, 1), (0, 1)], edge_attrs={"weight": [1, 7, 6]})
+    with pytest.raises(AssertionError, match="weight"):
+        IGraph.Type.assert_equal(IGraph(g1), IGraph(g3), aprops, aprops, {}, {})
+    # Edge multiplicity differs
+    g4 = Graph(3, edges=[(1, 2), (0, 1), (1, 2)], edge_attrs={"weight": [1, 7, 5]})
+    with pytest.raises(AssertionError, match="Mismatched edges"):
+        IGraph.Type.assert_equal(IGraph(g1), IGraph(g4), aprops, aprops, {}, {})
+
+
+def test_node_id_array():
+    g = Graph(3, edges=[(0, 1), (1, 2)])
+    x = IGraph(g, node_ids=[30, 10, 20])
+    node_ids = x.node_id_array()
+    assert (node_ids == [30, 10, 20]).all()
+    assert x.node_id_array() is node_ids
+    assert not node_ids.flags.writeable
+    assert (x.indices_to_node_ids([2, 0]) == [20, 30]).all()
+    assert (IGraph(g).node_id_array() == [0, 1, 2]).all()
+    assert (IGraph(g).indices_to_node_ids([2, 0]) == [2, 0]).all()
@@ -1,6 +1,7 @@
 from metagraph import translator
-from metagraph.plugins import has_grblas
+from metagraph.plugins import has_grblas, has_scipy
 from .types import IGraph
+from .algorithms._snapshot import mirror_edges
 import igraph
 import numpy as np
 
@@ -24,23 +25,28 @@ if has_grblas:
         vcount = x.nodes.nvals
         is_sequential = x.nodes.size == vcount
         idx, node_weights = x.nodes.to_values()
-        graph = igraph.Graph(vcount, directed=xprops["is_directed"])
         if is_sequential:
             rows, cols, edge_weights = x.value.to_values()
         else:
-            # Compress node ids as required by IGraph and add NodeId attributes to `vs`
+            # Compress node ids as required by IGraph
             compressed = x.value[idx, idx].new()
             rows, cols, edge_weights = compressed.to_values()
-            graph.vs["NodeId"] = idx.tolist()
-        graph.add_edges(zip(rows.tolist(), cols.tolist()))
+        if not xprops["is_directed"]:
+            # Undirected edges are stored in both triangles; keep only one copy of each
+            upper = rows <= cols
+            rows, cols, edge_weights = rows[upper], cols[upper], edge_weights[upper]
 
+        # Build all edges at once from a single (nedges, 2) integer array
+        graph = igraph.Graph(
+            vcount, edges=np.column_stack((rows, cols)), directed=xprops["is_directed"]
+        )
+        if not is_sequential:
+            graph.vs["NodeId"] = idx.tolist()
         if xprops["node_type"] == "map":
             graph.vs["weight"] = node_weights.tolist()
         if xprops["edge_type"] == "map":
             graph.es["weight"] = edge_weights.tolist()
-        if not xprops["is_directed"]:
-            graph.simplify(multiple=True, loops=False, combine_edges="first")
-        return IGraph(graph, aprops=xprops)
+        return IGraph(graph, aprops=xprops, assume_unique=True)
 
     @translator
     def graph_to_graphblas(x: IGraph, **props) -> GrblasGraph:
@@ -55,25 +61,20 @@ if has_grblas:
             "float": grblas.dtypes.FP64,
             None: grblas.dtypes.UINT8,  # unweighted graph
         }
-        rows, cols = list(zip(*x.value.get_edgelist()))
+        rows, cols = x.edge_arrays()
         if xprops["edge_type"] == "map":
-            vals = x.value.es[x.edge_weight_label]
+            vals = np.array(x.value.es[x.edge_weight_label])
         else:
-            vals = np.ones_like(rows)
+            vals = np.ones(len(rows), dtype=np.uint8)
 
         # Handle non-sequential graph
         if not x.is_sequential():
-            node_ids = np.array(x.value.vs["NodeId"])
-            rows = node_ids[list(rows)]
-            cols = node_ids[list(cols)]
-            nn = node_ids.max() + 1
+            node_ids = x._node_id_index().node_ids
+            rows = node_ids[rows]
+            cols = node_ids[cols]
+            nn = node_ids.max() + 1 if len(node_ids) > 0 else 0
         else:
-            node_ids = x.value.vs.indices
-
-        # Undirected graph must add reversed edges
-        if not xprops["is_directed"]:
-            rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
-            vals = np.concatenate([vals, vals])
+            node_ids = np.arange(nn)
 
         m = grblas.Matrix.from_values(
             rows,
@@ -84,10 +85,84 @@ if has_grblas:
             dtype=dmap[xprops["edge_dtype"]],
             dup_op=grblas.binary.max,
         )
+        # Undirected graph must add reversed edges; let GraphBLAS symmetrize the matrix
+        if not xprops["is_directed"]:
+            m = m.ewise_add(m.T, grblas.monoid.max).new()
 
         if xprops["node_type"] == "map":
-            nodes = grblas.Vector.from_values(node_ids, x.value.vs[x.node_weight_label])
+            nodes = grblas.Vector.from_values(
+                node_ids, x.value.vs[x.node_weight_label], size=nn
+            )
         else:
-            nodes = grblas.Vector.from_values(node_ids, np.ones(x.value.vcount(), bool))
+            nodes = grblas.Vector.from_values(
+                node_ids, np.ones(len(node_ids), bool), size=nn
+            )
 
         return GrblasGraph(m, nodes, aprops=xprops)
+
+
+if has_scipy:
+    import scipy.sparse as ss
+    from metagraph.plugins.scipy.types import ScipyGraph
+
+    @translator
+    def graph_from_scipy(x: ScipyGraph, **props) -> IGraph:
+        xprops = ScipyGraph.Type.compute_abstract_properties(
+            x, ["is_directed", "node_type", "node_dtype", "edge_type", "edge_dtype"]
+        )
+
+        nn = x.value.shape[0]
+        m = x.value.tocoo()
+        rows, cols, edge_weights = m.row, m.col, m.data
+        if not xprops["is_directed"]:
+            # Undirected edges are stored in both triangles; keep only one copy of each
+            upper = rows <= cols
+            rows, cols, edge_weights = rows[upper], cols[upper], edge_weights[upper]
+
+        graph = igraph.Graph(
+            nn, edges=np.column_stack((rows, cols)), directed=xprops["is_directed"]
+        )
+        node_list = x.node_list
+        if not (node_list == np.arange(nn)).all():
+            graph.vs["NodeId"] = node_list.tolist()
+        if xprops["node_type"] == "map":
+            graph.vs["weight"] = x.node_vals.tolist()
+        if xprops["edge_type"] == "map":
+            graph.es["weight"] = edge_weights.tolist()
+        return IGraph(graph, aprops=xprops)
+
+    @translator
+    def graph_to_scipy(x: IGraph, **props) -> ScipyGraph:
+        xprops = IGraph.Type.compute_abstract_properties(
+            x, ["is_directed", "node_type", "node_dtype", "edge_type", "edge_dtype"]
+        )
+
+        nn = x.value.vcount()
+        rows, cols = x.edge_arrays()
+        if xprops["edge_type"] == "map":
+            vals = np.array(x.value.es[x.edge_weight_label])
+        else:
+            vals = np.ones(len(rows), dtype=bool)
+
+        # Undirected graph must add reversed edges (self-loops are only stored once)
+        if not xprops["is_directed"]:
+            rows, cols, vals = mirror_edges(rows, cols, vals)
+
+        # Build the CSR arrays directly; parallel edges keep the max weight
+        order = np.lexsort((cols, rows))
+        rows, cols, vals = rows[order], cols[order], vals[order]
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+        if not first.all():
+            vals = np.maximum.reduceat(vals, np.flatnonzero(first))
+            rows, cols = rows[first], cols[first]
+        indptr = np.zeros(nn + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=nn), out=indptr[1:])
+        m = ss.csr_matrix((vals, cols, indptr), shape=(nn, nn))
+
+        node_list = None if x.is_sequential() else x._node_id_index().node_ids
+        node_vals = None
+        if xprops["node_type"] == "map":
+            node_vals = np.array(x.value.vs[x.node_weight_label])
+
+        return ScipyGraph(m, node_list, node_vals, aprops=xprops)
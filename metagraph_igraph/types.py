@@ -2,13 +2,172 @@ from metagraph.plugins.core.wrappers import GraphWrapper
 from metagraph.plugins.core.types import Graph
 from metagraph.core.dtypes import dtypes_simplified
 import igraph
-import math
-import operator
-from functools import partial
+import itertools
 from typing import Set, Dict, Any
 import numpy as np
 
 
+def _scan_weights(values):
+    """
+    Converts a list of weights into one contiguous array and returns (dtype, has_negative_weights).
+    has_negative_weights is None for non-numeric weights.
+    """
+    arr = np.array(values)
+    dtype = dtypes_simplified.get(arr.dtype, "str")
+    if dtype in {"bool", "str"}:
+        return dtype, None
+    return dtype, bool(len(arr) > 0 and arr.min() < 0)
+
+
+def _sorted_node_ids(obj):
+    """Returns (sorted NodeIds, vertex indices in NodeId order)"""
+    if obj.is_sequential():
+        indices = np.arange(obj.value.vcount())
+        return indices, indices
+    node_ids = obj._node_id_index().node_ids
+    order = np.argsort(node_ids, kind="stable")
+    return node_ids[order], order
+
+
+def _canonical_edges(obj, is_directed, weighted):
+    """
+    Returns (sources, targets, weights) expressed in NodeIds and sorted by (source, target, weight).
+    Undirected edges are oriented so that source <= target. weights is None if not weighted.
+    """
+    sources, targets = obj.edge_arrays()
+    if not obj.is_sequential():
+        node_ids = obj.node_id_array()
+        sources, targets = node_ids[sources], node_ids[targets]
+    if not is_directed:
+        sources, targets = np.minimum(sources, targets), np.maximum(sources, targets)
+    if weighted:
+        weights = np.array(obj.value.es[obj.edge_weight_label])
+        order = np.lexsort((weights, targets, sources))
+        weights = weights[order]
+    else:
+        weights = None
+        order = np.lexsort((targets, sources))
+    return sources[order], targets[order], weights
+
+
+def _edge_records(sources, targets):
+    """Packs edges into a structured array so they can be used with NumPy set operations"""
+    records = np.empty(
+        len(sources), dtype=[("source", sources.dtype), ("target", targets.dtype)]
+    )
+    records["source"] = sources
+    records["target"] = targets
+    return records
+
+
+def _as_node_id_dtype(arr, dtype):
+    """
+    Converts queried NodeIds to the dtype of the graph's NodeIds, so that every lookup path treats them alike.
+    Integers of any width are kept as they are and floats must hold integral values; raises TypeError otherwise.
+    """
+    integer_kinds = {"i", "u"}
+    if (
+        arr.size == 0
+        or arr.dtype.kind == dtype.kind
+        or (arr.dtype.kind in integer_kinds and dtype.kind in integer_kinds)
+    ):
+        return arr
+    try:
+        with np.errstate(invalid="ignore"):
+            converted = arr.astype(dtype)
+            exact = bool(np.all(converted == arr))
+    except (TypeError, ValueError):
+        exact = False
+    if not exact:
+        raise TypeError(
+            f"NodeIds of dtype {arr.dtype} do not match graph NodeIds of dtype {dtype}"
+        )
+    return converted
+
+
+class NodeIdIndex:
+    """
+    Reverse lookup from NodeId to igraph vertex index, built from a single array of NodeIds.
+
+    Dense non-negative NodeIds are stored in an offset table indexed by NodeId.
+    Sparse NodeIds are stored as a sorted array and looked up with ``np.searchsorted``.
+    """
+
+    # Offset table is used when max(NodeId) < DENSITY_FACTOR * len(node_ids)
+    DENSITY_FACTOR = 4
+
+    def __init__(self, node_ids, *, assume_unique=False):
+        node_ids = np.asarray(node_ids)
+        if node_ids.ndim != 1:
+            raise TypeError(f"Invalid number of dimensions: {node_ids.ndim}")
+        self.node_ids = node_ids
+        size = len(node_ids)
+        self._table = None
+        self._sorted = None
+        self._sorter = None
+        if (
+            size > 0
+            and issubclass(node_ids.dtype.type, np.integer)
+            and node_ids.min() >= 0
+            and node_ids.max() < self.DENSITY_FACTOR * size
+        ):
+            table = np.full(node_ids.max() + 1, -1, dtype=np.int64)
+            table[node_ids] = np.arange(size)
+            self._table = table
+            self.is_unique = assume_unique or np.count_nonzero(table >= 0) == size
+        else:
+            self._sorter = np.argsort(node_ids, kind="stable")
+            self._sorted = node_ids[self._sorter]
+            self.is_unique = assume_unique or bool(
+                (self._sorted[1:] != self._sorted[:-1]).all()
+            )
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def __iter__(self):
+        return iter(self.node_ids)
+
+    def __contains__(self, node_id):
+        try:
+            arr = _as_node_id_dtype(np.asarray(node_id), self.node_ids.dtype)
+        except TypeError:
+            return False
+        return bool(self._find(arr)[1].all())
+
+    def _find(self, node_ids):
+        """Returns (indices, found_mask); indices are only meaningful where found_mask is True"""
+        if self._table is not None:
+            in_range = (node_ids >= 0) & (node_ids < len(self._table))
+            pos = np.where(in_range, node_ids, 0)
+            indices = self._table[pos]
+            return indices, in_range & (indices >= 0)
+        if len(self._sorted) == 0:
+            shape = np.shape(node_ids)
+            return np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=bool)
+        pos = np.searchsorted(self._sorted, node_ids)
+        pos = np.minimum(pos, len(self._sorted) - 1)
+        return self._sorter[pos], self._sorted[pos] == node_ids
+
+    def lookup(self, node_ids, missing=None):
+        """
+        Maps NodeIds to vertex indices. Accepts a scalar NodeId or an array-like of NodeIds.
+
+        Raises KeyError if any NodeId is not in the index, unless ``missing`` is given,
+        in which case NodeIds not in the index map to ``missing``.
+        """
+        arr = _as_node_id_dtype(np.asarray(node_ids), self.node_ids.dtype)
+        indices, found = self._find(arr)
+        if not found.all():
+            if missing is None:
+                not_found = arr[~found] if arr.ndim else arr
+                raise KeyError(f"NodeIds not found in graph: {not_found}")
+            indices = np.where(found, indices, missing)
+        if arr.ndim == 0:
+            return int(indices)
+        return indices
+
+
 class IGraph(GraphWrapper, abstract=Graph):
     def __init__(
         self,
@@ -18,15 +177,24 @@ class IGraph(GraphWrapper, abstract=Graph):
         edge_weight_label="weight",
         *,
         aprops=None,
+        assume_unique=False,
     ):
         """
         :param graph: an igraph.Graph object
         :param node_ids: list of NodeIDs corresponding to the graph's vertex ids
         :param node_weight_label: default is "weight"
         :param edge_weight_label: default is "weight"
+        :param assume_unique: if True, the NodeIds are trusted to be unique and are never validated
 
         The node_ids will be used to add a "NodeId" vertex attribute to a copy of the graph.
         Manually adding the "NodeId" vertex attribute will avoid the copy and achieves the same result.
+
+        The NodeId lookup (and the uniqueness check of NodeIds) is built on first use.
+
+        Arrays copied out of the graph are cached on the wrapper and rebuilt when vertices, edges or
+        attribute names are added or removed. Mutations which keep all of those, such as rewiring
+        an edge or assigning new NodeId values, are not detected; call
+        ``metagraph_igraph.cache.invalidate(graph)`` after them.
         """
         super().__init__(aprops=aprops)
         self._assert_instance(graph, igraph.Graph)
@@ -43,24 +211,125 @@ class IGraph(GraphWrapper, abstract=Graph):
             self.value = graph.copy()
             self.value.vs["NodeId"] = node_ids
 
-        if "NodeId" in self.value.vs.attributes():
-            self._is_sequential = False
-            self._nodeid_lookup = {v["NodeId"]: v.index for v in self.value.vs}
-            self._assert(
-                len(self._nodeid_lookup) == self.value.vcount(),
-                "node_ids are not unique",
-            )
-        else:
-            self._is_sequential = True
+        self._is_sequential = "NodeId" not in self.value.vs.attributes()
+        self._assume_unique = assume_unique
+        self._aprops_fingerprint = self._mutation_fingerprint()
+        self._snapshots = {}
+        self._snapshots_fingerprint = self._aprops_fingerprint
 
     def is_sequential(self):
         return self._is_sequential
 
+    def _mutation_fingerprint(self):
+        """Cheap summary of ``self.value`` used to detect that the graph was mutated"""
+        g = self.value
+        return (
+            g.vcount(),
+            g.ecount(),
+            g.is_directed(),
+            tuple(g.vs.attributes()),
+            tuple(g.es.attributes()),
+            self.node_weight_label,
+            self.edge_weight_label,
+        )
+
+    def node_id_array(self) -> np.ndarray:
+        """
+        Returns the NodeIds of all vertices in vertex index order as a read-only NumPy array.
+
+        The NodeId attribute is copied out of igraph once and cached until the graph is mutated,
+        so algorithms which build results over the same graph share a single array.
+        """
+        return self._cached_snapshot("node_ids", self._build_node_id_array)
+
+    def _build_node_id_array(self) -> np.ndarray:
+        if self._is_sequential:
+            node_ids = np.arange(self.value.vcount())
+        else:
+            node_ids = np.array(self.value.vs["NodeId"])
+        node_ids.flags.writeable = False
+        return node_ids
+
+    def _cached_snapshot(self, key, build):
+        """
+        Returns ``build()`` for ``key``, reusing the stored result until the mutation fingerprint changes.
+
+        Snapshots are copies of the graph's structure or NodeIds shared between callers, so they must
+        not be modified. The fingerprint only covers counts and attribute names; ``_reset_caches``
+        drops the snapshots after other mutations.
+        """
+        fingerprint = self._mutation_fingerprint()
+        if fingerprint != self._snapshots_fingerprint:
+            self._snapshots.clear()
+            self._snapshots_fingerprint = fingerprint
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            snapshot = self._snapshots[key] = build()
+        return snapshot
+
+    def _reset_caches(self):
+        """Drops every snapshot and cached property of the graph, for mutations the fingerprint misses"""
+        self._snapshots.clear()
+        self._snapshots_fingerprint = None
+        self._aprops_fingerprint = None
+
+    def indices_to_node_ids(self, indices):
+        """Maps a vertex index or an array of vertex indices to NodeIds"""
+        if self._is_sequential:
+            return np.asarray(indices)
+        return self.node_id_array()[indices]
+
+    def _node_id_index(self) -> NodeIdIndex:
+        """Returns the NodeId lookup, building and validating it on first use after each mutation"""
+        return self._cached_snapshot("node_id_index", self._build_node_id_index)
+
+    def _build_node_id_index(self) -> NodeIdIndex:
+        index = NodeIdIndex(self.node_id_array(), assume_unique=self._assume_unique)
+        self._assert(index.is_unique, "node_ids are not unique")
+        return index
+
+    def edge_arrays(self):
+        """
+        Returns (sources, targets) as int64 NumPy arrays of vertex indices, ordered by edge id.
+
+        The edge list is copied out of igraph in one bulk call into a single flat buffer.
+        """
+        g = self.value
+        flat = np.fromiter(
+            itertools.chain.from_iterable(g.get_edgelist()),
+            dtype=np.int64,
+            count=2 * g.ecount(),
+        )
+        return flat[0::2], flat[1::2]
+
+    def node_ids_to_indices(self, node_ids, missing=None):
+        """
+        Maps a NodeId or an array of NodeIds to igraph vertex indices in one call.
+
+        For sequential graphs, NodeIds are the vertex indices and are only bounds-checked.
+        Raises KeyError for NodeIds not in the graph, unless ``missing`` is given,
+        in which case those NodeIds map to ``missing``.
+        """
+        if self._is_sequential:
+            arr = _as_node_id_dtype(np.asarray(node_ids), np.dtype(np.int64))
+            out_of_range = (arr < 0) | (arr >= self.value.vcount())
+            if out_of_range.any():
+                if missing is None:
+                    raise KeyError(f"NodeIds not found in graph: {node_ids}")
+                arr = np.where(out_of_range, missing, arr)
+            return int(arr) if arr.ndim == 0 else arr
+        return self._node_id_index().lookup(node_ids, missing=missing)
+
     class TypeMixin:
         @classmethod
         def _compute_abstract_properties(
             cls, obj, props: Set[str], known_props: Dict[str, Any]
         ) -> Dict[str, Any]:
+            # metagraph memoizes known_props per object; they are stale once the graph is mutated
+            fingerprint = obj._mutation_fingerprint()
+            if fingerprint != obj._aprops_fingerprint:
+                known_props.clear()
+                obj._aprops_fingerprint = fingerprint
             ret = known_props.copy()
 
             # fast properties
@@ -84,19 +353,14 @@ class IGraph(GraphWrapper, abstract=Graph):
             # slow properties, only compute if needed
             slow_props = props - ret.keys()
             if {"edge_dtype", "edge_has_negative_weights"} & slow_props:
+                # Both are computed from the same array, so cache both
                 evals = obj.value.es[obj.edge_weight_label]
-                earr = np.array(evals)
-                ret["edge_dtype"] = dtypes_simplified.get(earr.dtype, "str")
-                if "edge_has_negative_weights" in slow_props:
-                    if ret["edge_dtype"] in {"bool", "str"}:
-                        neg_weights = None
-                    else:
-                        neg_weights = earr.min() < 0
-                    ret["edge_has_negative_weights"] = neg_weights
+                edge_dtype, neg_weights = _scan_weights(evals)
+                ret.setdefault("edge_dtype", edge_dtype)
+                ret.setdefault("edge_has_negative_weights", neg_weights)
             if "node_dtype" in slow_props:
                 vvals = obj.value.vs[obj.node_weight_label]
-                varr = np.array(vvals)
-                ret["node_dtype"] = dtypes_simplified.get(varr.dtype, "str")
+                ret["node_dtype"], _ = _scan_weights(vvals)
 
             return ret
 
@@ -112,22 +376,11 @@ class IGraph(GraphWrapper, abstract=Graph):
             *,
             rel_tol=1e-9,
             abs_tol=0.0,
+            max_mismatches=10,
         ):
             assert aprops1 == aprops2, f"property mismatch: {aprops1} != {aprops2}"
             g1 = obj1.value
             g2 = obj2.value
-            seq1 = obj1.is_sequential()
-            seq2 = obj2.is_sequential()
-            nid1 = set(g1.vs.indices) if seq1 else set(obj1._nodeid_lookup)
-            nid2 = set(g2.vs.indices) if seq2 else set(obj2._nodeid_lookup)
-            v1 = g1.vs
-            if not seq1:
-                sorter = np.array(v1["NodeId"]).argsort()
-                v1 = v1[sorter.tolist()]
-            v2 = g2.vs
-            if not seq2:
-                sorter = np.array(g2.vs["NodeId"]).argsort()
-                v2 = v2[sorter.tolist()]
             # Compare
             assert (
                 g1.ecount() == g2.ecount()
@@ -135,36 +388,52 @@ class IGraph(GraphWrapper, abstract=Graph):
             assert (
                 g1.vcount() == g2.vcount()
             ), f"num node mismatch: {g1.vcount()} != {g2.vcount()}"
-            assert nid1 == nid2, f"node id mismatch: {nid1 ^ nid2}"
+            nid1, vorder1 = _sorted_node_ids(obj1)
+            nid2, vorder2 = _sorted_node_ids(obj2)
+            if not (nid1 == nid2).all():
+                diff = np.setxor1d(nid1, nid2)
+                assert False, f"node id mismatch: {diff[:max_mismatches]}"
 
             if aprops1.get("node_type") == "map":
                 v1vals = np.array(
-                    v1[obj1.node_weight_label], dtype=aprops1["node_dtype"]
-                )
+                    g1.vs[obj1.node_weight_label], dtype=aprops1["node_dtype"]
+                )[vorder1]
                 v2vals = np.array(
-                    v2[obj2.node_weight_label], dtype=aprops2["node_dtype"]
-                )
+                    g2.vs[obj2.node_weight_label], dtype=aprops2["node_dtype"]
+                )[vorder2]
                 if aprops1["node_dtype"] == "float":
-                    assert np.isclose(v1vals, v2vals, rtol=rel_tol, atol=abs_tol)
+                    same = np.isclose(v1vals, v2vals, rtol=rel_tol, atol=abs_tol)
                 else:
-                    assert (v1vals == v2vals).all()
+                    same = v1vals == v2vals
+                bad = np.flatnonzero(~same)[:max_mismatches]
+                assert len(bad) == 0, (
+                    f"node value mismatch (NodeId, value1, value2): "
+                    f"{list(zip(nid1[bad], v1vals[bad], v2vals[bad]))}"
+                )
 
-            if aprops1.get("edge_type") == "map":
+            weighted = aprops1.get("edge_type") == "map"
+            is_directed = g1.is_directed()
+            s1, t1, w1 = _canonical_edges(obj1, is_directed, weighted)
+            s2, t2, w2 = _canonical_edges(obj2, is_directed, weighted)
+            if not ((s1 == s2).all() and (t1 == t2).all()):
+                pairs1 = _edge_records(s1, t1)
+                pairs2 = _edge_records(s2, t2)
+                only1 = np.setdiff1d(pairs1, pairs2)[:max_mismatches]
+                only2 = np.setdiff1d(pairs2, pairs1)[:max_mismatches]
+                assert False, (
+                    f"Mismatched edges: only in first {only1.tolist()}, "
+                    f"only in second {only2.tolist()} (or differing edge multiplicity)"
+                )
+
+            if weighted:
                 if aprops1["edge_dtype"] == "float":
-                    comp = partial(math.isclose, rel_tol=rel_tol, abs_tol=abs_tol)
+                    same = np.isclose(w1, w2, rtol=rel_tol, atol=abs_tol)
                     compstr = "close to"
                 else:
-                    comp = operator.eq
+                    same = w1 == w2
                     compstr = "equal to"
-                for e1 in g1.es:
-                    sid = e1.source if seq1 else e1.source_vertex["NodeId"]
-                    tid = e1.target if seq1 else e1.target_vertex["NodeId"]
-                    s2 = sid if seq2 else obj2._nodeid_lookup[sid]
-                    t2 = tid if seq2 else obj2._nodeid_lookup[tid]
-                    try:
-                        e2 = g2.es[g2.get_eid(s2, t2)]
-                    except igraph.InternalError:
-                        raise AssertionError(f"Mismatched edge: {sid, tid}")
-                    w1 = e1[obj1.edge_weight_label]
-                    w2 = e2[obj2.edge_weight_label]
-                    assert comp(w1, w2), f"{w1} not {compstr} {w2}"
+                bad = np.flatnonzero(~same)[:max_mismatches]
+                assert len(bad) == 0, (
+                    f"edge weights not {compstr} (source, target, weight1, weight2): "
+                    f"{list(zip(s1[bad], t1[bad], w1[bad], w2[bad]))}"
+                )
@@ -9,7 +9,7 @@ setup(
     author="Anaconda, Inc.",
     packages=find_packages(include=["metagraph_igraph", "metagraph_igraph.*"]),
     include_package_data=True,
-    install_requires=["metagraph", "python-igraph"],
+    install_requires=["metagraph", "python-igraph>=0.10"],
     entry_points={
         "metagraph.plugins": "plugins=metagraph_igraph.registry:find_plugins"
     },